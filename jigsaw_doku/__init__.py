@@ -0,0 +1,4 @@
+import logging
+
+# library logging: records go nowhere until the caller configures a handler
+logging.getLogger(__name__).addHandler(logging.NullHandler())
@@ -0,0 +1,114 @@
+# Stream puzzles: python -m jigsaw_doku --size 9 --count 1000 --jobs 4 > puzzles.ndjson
+import argparse, json, os, sys, time
+from .batch import GRID_MAX_SIZE, LARGE_MAX_SIZE, PUZZLE_ENGINES, iter_puzzles
+from .jigsaw_board import box_shape
+from .packed import PackedWriter
+
+
+# One NDJSON line per puzzle; grids are lists of [x] rows of [y] cells
+def puzzle_json(p):
+    return json.dumps(dict(size=p.size, seed=p.seed, labels=p.labels.tolist(), solution=p.solution.tolist(),
+        givens=p.givens.tolist()), separators=(',', ':'))
+
+
+# Throughput lines on stderr, every `every` seconds (0 = only the final summary)
+class Reporter:
+
+    def __init__(self, every=0, stream=None):
+        self.every = every
+        self.stream = sys.stderr if stream is None else stream
+        self.start = self.last = time.perf_counter()
+        self.count = 0
+
+    def tick(self, n=1):
+        self.count += n
+        if self.every > 0:
+            now = time.perf_counter()
+            if now - self.last >= self.every:
+                self.last = now
+                self.report()
+
+    def report(self, final=False):
+        elapsed = time.perf_counter() - self.start
+        rate = self.count/elapsed if elapsed > 0 else 0.0
+        self.stream.write('{}{} puzzles in {:.1f}s ({:.1f}/s)\n'.format('done: ' if final else '',
+            self.count, elapsed, rate))
+        self.stream.flush()
+
+
+def write_ndjson(puzzles, out, reporter):
+    for p in puzzles:
+        out.write(puzzle_json(p))
+        out.write('\n')
+        reporter.tick()
+
+
+# Packed records go out in batches of `batch`
+def write_packed(puzzles, writer, reporter, batch=256):
+    pending = list()
+
+    def flush():
+        if pending:
+            writer.write_many([p.labels for p in pending], [p.solution for p in pending],
+                [p.givens for p in pending], seeds=[p.seed for p in pending])
+            reporter.tick(len(pending))
+            pending.clear()
+    for p in puzzles:
+        pending.append(p)
+        if len(pending) >= batch:
+            flush()
+    flush()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m jigsaw_doku', description='Stream jigsaw sudoku puzzles')
+    parser.add_argument('--size', type=int, default=9, help='2..{} with any engine; up to {} with a box shape '
+        '(not prime) through the large engine'.format(GRID_MAX_SIZE, LARGE_MAX_SIZE))
+    parser.add_argument('--count', type=int, default=1, help='puzzles to generate (0 = until interrupted)')
+    parser.add_argument('--jobs', type=int, default=1, help='worker processes (0 = one per CPU)')
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--engine', choices=PUZZLE_ENGINES, default=None,
+        help='large: layout and digits together (sizes with a box shape, default); grid: grow then fill')
+    parser.add_argument('--givens', action='store_true', help='remove clues down to a unique puzzle (slow beyond 9x9)')
+    parser.add_argument('--format', choices=('ndjson', 'packed'), default='ndjson')
+    parser.add_argument('--out', default='-', help='file to append to (- = stdout)')
+    parser.add_argument('--report', type=float, default=0, help='seconds between throughput lines on stderr')
+    parser.add_argument('--chunksize', type=int, default=16, help='puzzles per worker task')
+    args = parser.parse_args(argv)
+    if not 2 <= args.size <= LARGE_MAX_SIZE:
+        parser.error('--size must be between 2 and {}, got {}'.format(LARGE_MAX_SIZE, args.size))
+    if args.engine == 'large' and box_shape(args.size) is None:
+        parser.error('--engine large needs a size with a box shape (not prime), got {}; use --engine grid'.format(args.size))
+    # prime sizes default to the grid engine
+    if (args.engine == 'grid' or box_shape(args.size) is None) and args.size > GRID_MAX_SIZE:
+        parser.error('the grid engine only goes up to size {}, got {}{}'.format(GRID_MAX_SIZE, args.size,
+            '' if box_shape(args.size) is None else '; use --engine large'))
+
+    puzzles = iter_puzzles(size=args.size, count=args.count or None, workers=args.jobs or None, seed=args.seed,
+        engine=args.engine, givens=args.givens, chunksize=args.chunksize)
+    reporter = Reporter(args.report)
+    try:
+        if args.format == 'ndjson':
+            if args.out == '-':
+                write_ndjson(puzzles, sys.stdout, reporter)
+                sys.stdout.flush()
+            else:
+                with open(args.out, 'a') as f:
+                    write_ndjson(puzzles, f, reporter)
+        else:
+            with PackedWriter(sys.stdout.buffer if args.out == '-' else args.out, size=args.size) as writer:
+                write_packed(puzzles, writer, reporter)
+    except BrokenPipeError:
+        # reader went away (e.g. piped into head); keep Python from complaining on exit
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        return 1
+    except KeyboardInterrupt:
+        return 130
+    finally:
+        puzzles.close()
+        reporter.report(final=True)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
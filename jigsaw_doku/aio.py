@@ -0,0 +1,81 @@
+# asyncio front end for layout generation.
+#
+# A layout is grown in small chunks of region steps (see `JigsawGrid.iter_regions`), each run in an
+# executor, so the event loop never waits on more than one chunk and a cancelled or timed-out
+# generation stops at the next chunk boundary instead of running to the end. Every generation is
+# bounded: by `timeout` if given, and always by a budget of region steps.
+import asyncio, random
+import numpy as np
+from .jigsaw_board import JigsawGrid, JigsawSudoku, regions_to_labels
+
+ENGINES = ('grid', 'shapely')
+
+
+# Executor side: run up to `steps` steps of an `iter_regions` iterator; True once `n` regions
+# are complete
+def run_steps(steps_iter, steps, n):
+    for _ in range(0, steps):
+        if next(steps_iter, n) >= n:
+            return True
+    return False
+
+
+# Build one layout without blocking the event loop; returns the finished board (`JigsawGrid` for
+# 'grid', `JigsawSudoku` for 'shapely'). `steps` region steps run per executor call (None = the
+# loop's default executor). Raises TimeoutError past `timeout` seconds and RuntimeError after
+# `max_steps` region steps (default 100 per region); cancelling the awaiting task stops it after
+# the chunk in flight
+async def generate_layout(size=9, engine='grid', rng=None, timeout=None, max_steps=None, steps=4,
+        executor=None, stats=None):
+    if engine == 'grid':
+        board = JigsawGrid(size=size, auto_generate=False, timeout=None, rng=rng, stats=stats)
+    elif engine == 'shapely':
+        board = JigsawSudoku(size=size, auto_generate=False, timeout=None, rng=rng, stats=stats)
+    else:
+        raise ValueError('engine must be one of {}'.format(ENGINES))
+    max_steps = 100*size if max_steps is None else max_steps
+    loop = asyncio.get_running_loop()
+    deadline = None if timeout is None else loop.time() + timeout
+    steps_iter = board.iter_regions()
+    done, taken = False, 0
+    while not done:
+        if taken >= max_steps:
+            raise RuntimeError('no {0}x{0} layout after {1} region steps'.format(size, taken))
+        chunk = loop.run_in_executor(executor, run_steps, steps_iter, min(steps, max_steps - taken), size)
+        if deadline is None:
+            done = await chunk
+        else:
+            done = await asyncio.wait_for(chunk, max(deadline - loop.time(), 0))
+        taken += min(steps, max_steps - taken)
+    return board
+
+
+# Label grid (region # per [x, y] cell) of a layout from `generate_layout`
+def layout_labels(board):
+    if isinstance(board, JigsawGrid):
+        return board.labels
+    return regions_to_labels(board.regions, board.size)
+
+
+# `n` layouts at once, at most `concurrency` in flight, as a (n, size, size) uint8 array. Each
+# layout gets its own `random.Random` seeded from `seed`, so the result only depends on
+# (n, size, seed, engine). If any layout fails or the call is cancelled, the rest are cancelled too
+async def generate_layouts(n, size=9, seed=None, concurrency=4, engine='grid', timeout=None,
+        max_steps=None, steps=4, executor=None):
+    seeds = np.random.SeedSequence(seed).generate_state(max(n, 1), dtype=np.uint64)[:n]
+    limit = asyncio.Semaphore(concurrency)
+
+    async def one(s):
+        async with limit:
+            board = await generate_layout(size, engine=engine, rng=random.Random(int(s)), timeout=timeout,
+                max_steps=max_steps, steps=steps, executor=executor)
+            return layout_labels(board)
+    tasks = [asyncio.ensure_future(one(s)) for s in seeds]
+    try:
+        layouts = await asyncio.gather(*tasks)
+    finally:
+        for t in tasks:
+            t.cancel()
+    if len(layouts) == 0:
+        return np.empty((0, size, size), dtype=np.uint8)
+    return np.stack(layouts)
@@ -0,0 +1,168 @@
+# Batch layout and puzzle generation across a process pool
+import os, random
+import numpy as np
+from collections import deque, namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from .jigsaw_board import JigsawChain, JigsawGrid, JigsawSudoku, regions_to_labels
+from .large import LargeBoard, box_shape
+from .tiling import JigsawTiling
+from .dlx import MAX_NODES, solve as fill_digits
+from .puzzle import make_puzzle
+
+ENGINES = ('grid', 'shapely', 'chain', 'tiling')
+PUZZLE_ENGINES = ('large', 'grid')
+# Largest sizes each puzzle engine finishes in reasonable time: grow-and-fill takes seconds per
+# board from 16x16 (17x17 up to about 12 s, 19x19 up to about 17 s), 'large' about 3.5 s at 64x64
+GRID_MAX_SIZE = 16
+LARGE_MAX_SIZE = 64
+
+# A finished board, all (size, size) uint8 indexed [x, y]: region # per cell, digits, and the
+# clues (0 = blank; the full solution when no clues were removed). `seed` alone regenerates it
+Puzzle = namedtuple('Puzzle', ['size', 'seed', 'labels', 'solution', 'givens'])
+
+
+# One layout as a (size, size) uint8 label grid (region # per [x, y] cell)
+def gen_layout(size, rng, engine='grid', timeout=10):
+    if engine == 'grid':
+        return JigsawGrid(size=size, timeout=timeout, rng=rng).labels
+    elif engine == 'shapely':
+        return regions_to_labels(JigsawSudoku(size=size, timeout=timeout, rng=rng).regions, size)
+    elif engine == 'chain':
+        return JigsawChain(size=size, rng=rng).labels
+    elif engine == 'tiling':
+        return JigsawTiling(size=size, rng=rng).labels
+    raise ValueError('engine must be one of {}'.format(ENGINES))
+
+
+# Worker: `count` layouts from its own random stream, stacked as (count, size, size)
+def gen_chunk(task):
+    size, count, seed, engine, timeout = task
+    rng = random.Random(seed)
+    out = np.empty((count, size, size), dtype=np.uint8)
+    for i in range(0, count):
+        out[i] = gen_layout(size, rng, engine=engine, timeout=timeout)
+    return out
+
+
+# Split n layouts into chunks, each with an independent seed drawn from `seed`, so the
+# output only depends on (n, size, seed, chunksize) and not on how many workers run it
+def chunk_tasks(n, size, seed=None, chunksize=64, engine='grid', timeout=10):
+    if engine not in ENGINES:
+        raise ValueError('engine must be one of {}'.format(ENGINES))
+    counts = [chunksize]*(n // chunksize) + ([n % chunksize] if n % chunksize else [])
+    seeds = np.random.SeedSequence(seed).spawn(len(counts))
+    return [(size, count, int(s.generate_state(2, dtype=np.uint64)[0]), engine, timeout) \
+        for count, s in zip(counts, seeds)]
+
+
+# Stream layouts in order as (chunk, size, size) uint8 arrays as chunks finish
+def iter_layouts(n, size=9, workers=None, seed=None, chunksize=64, engine='grid', timeout=10):
+    tasks = chunk_tasks(n, size, seed=seed, chunksize=chunksize, engine=engine, timeout=timeout)
+    if workers == 1:
+        for task in tasks:
+            yield gen_chunk(task)
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for chunk in pool.map(gen_chunk, tasks):
+                yield chunk
+
+
+# Generate n layouts over a process pool; returns a (n, size, size) uint8 array of region labels
+def generate_many(n, size=9, workers=None, seed=None, chunksize=64, engine='grid', timeout=10):
+    chunks = list(iter_layouts(n, size=size, workers=workers, seed=seed, chunksize=chunksize,
+        engine=engine, timeout=timeout))
+    if len(chunks) == 0:
+        return np.empty((0, size, size), dtype=np.uint8)
+    return np.concatenate(chunks)
+
+
+# Layout and digits for one board. 'large' builds both together (sizes with a box shape, the
+# default for those); 'grid' grows a layout and fills it with dancing links, moving on to a new
+# layout when a fill has no solution or runs past `max_nodes`. Raises RuntimeError after
+# `max_layouts` layouts without a fill (most boards up to GRID_MAX_SIZE need one to three)
+def gen_solved(size, rng, engine=None, timeout=10, max_nodes=MAX_NODES, max_layouts=20):
+    if engine is None:
+        engine = 'grid' if box_shape(size) is None else 'large'
+    if engine == 'large':
+        board = LargeBoard(size=size, rng=rng)
+        return board.labels, board.grid
+    elif engine == 'grid':
+        for _ in range(0, max_layouts):
+            labels = JigsawGrid(size=size, timeout=timeout, rng=rng).labels
+            try:
+                solution = fill_digits(labels, rng=rng, max_nodes=max_nodes)
+            except TimeoutError:
+                continue
+            if solution is not None:
+                return labels, solution
+        raise RuntimeError('no {0}x{0} fill after {1} layouts'.format(size, max_layouts))
+    raise ValueError('engine must be one of {}'.format(PUZZLE_ENGINES))
+
+
+# One puzzle, reproducible from (size, seed, engine, givens). With `givens`, clues are removed
+# while the solution stays unique (see `puzzle.make_puzzle`; slow beyond 9x9)
+def gen_puzzle(size, seed, engine=None, givens=False, timeout=10):
+    rng = random.Random(seed)
+    labels, solution = gen_solved(size, rng, engine=engine, timeout=timeout)
+    clues = make_puzzle(solution, labels, rng=rng) if givens else solution.copy()
+    return Puzzle(size, seed, labels, solution, clues)
+
+
+# Worker: puzzles for a list of seeds, stacked as (3, n, size, size) labels/solutions/givens
+# (one array is much cheaper to send back than n tuples)
+def gen_puzzle_chunk(task):
+    size, seeds, engine, givens, timeout = task
+    out = np.empty((3, len(seeds), size, size), dtype=np.uint8)
+    for i, s in enumerate(seeds):
+        p = gen_puzzle(size, s, engine=engine, givens=givens, timeout=timeout)
+        out[0, i], out[1, i], out[2, i] = p.labels, p.solution, p.givens
+    return seeds, out
+
+
+# Lists of 63-bit puzzle seeds, `chunksize` at a time, drawn from `seed`: `count` in all, or
+# endless if count is None. Each list comes from its own spawned SeedSequence, so the output
+# doesn't depend on how many workers consume it
+def puzzle_seed_chunks(count=None, seed=None, chunksize=16):
+    root = np.random.SeedSequence(seed)
+    done = 0
+    while count is None or done < count:
+        n = chunksize if count is None else min(chunksize, count - done)
+        state = root.spawn(1)[0].generate_state(n, dtype=np.uint64) >> np.uint64(1)
+        yield [int(s) for s in state]
+        done += n
+
+
+# `pool.map` for endless task streams: results in task order, with at most `depth` tasks
+# submitted ahead so memory stays bounded
+def ordered_map(pool, fn, tasks, depth):
+    pending = deque()
+    for task in tasks:
+        pending.append(pool.submit(fn, task))
+        if len(pending) >= depth:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+# Lazily yield finished `Puzzle`s: `count` of them, or an endless stream if count is None.
+# With workers != 1 chunks run on a process pool (None = one per CPU); the stream is the same
+# for a given seed and chunksize whatever the number of workers
+def iter_puzzles(size=9, count=None, workers=1, seed=None, engine=None, givens=False, chunksize=16, timeout=10):
+    if engine is not None and engine not in PUZZLE_ENGINES:
+        raise ValueError('engine must be one of {}'.format(PUZZLE_ENGINES))
+    if engine == 'large' and box_shape(size) is None:
+        raise ValueError('the large engine needs a size with a box shape, got {}'.format(size))
+    tasks = ((size, seeds, engine, givens, timeout) for seeds in puzzle_seed_chunks(count, seed, chunksize))
+    if workers == 1:
+        chunks = map(gen_puzzle_chunk, tasks)
+        pool = None
+    else:
+        pool = ProcessPoolExecutor(max_workers=workers)
+        chunks = ordered_map(pool, gen_puzzle_chunk, tasks, depth=2*(workers or os.cpu_count() or 1))
+    try:
+        for seeds, out in chunks:
+            for i, s in enumerate(seeds):
+                yield Puzzle(size, s, out[0, i], out[1, i], out[2, i])
+    finally:
+        if pool is not None:
+            pool.shutdown(wait=True, cancel_futures=True)
@@ -0,0 +1,112 @@
+# Vectorized candidate propagation over a batch of boards, with a per-board backtracking fallback
+import numpy as np
+from .puzzle import solve
+
+# status per board
+UNSOLVABLE = 0
+SOLVED_BY_SINGLES = 1
+SOLVED_BY_SEARCH = 2
+
+
+# Number of set bits in each element
+def popcount(a):
+    if hasattr(np, 'bitwise_count'):
+        return np.bitwise_count(a).astype(np.int64)
+    out = np.zeros(a.shape, dtype=np.int64)
+    a = a.astype(np.int64)
+    while a.any():
+        out += a & 1
+        a = a >> 1
+    return out
+
+
+# Flat cell indices (x*size + y) of every unit per board: x lines, y lines, then regions 1..size.
+# Returns (N, 3*size, size)
+def unit_cells(labels):
+    n_boards, size = labels.shape[0], labels.shape[1]
+    cells = np.arange(size*size).reshape(size, size)
+    lines = np.concatenate([cells, cells.T])
+    # stable sort of each board's labels groups its cells region by region
+    regions = np.argsort(labels.reshape(n_boards, -1), axis=1, kind='stable').reshape(n_boards, size, size)
+    return np.concatenate([np.broadcast_to(lines, (n_boards, 2*size, size)), regions], axis=1)
+
+
+# Propagate naked and hidden singles on a (N, size, size) stack of partial grids (0 = blank), all
+# boards at once. `labels` is a (N, size, size) stack of region #s, or one (size, size) layout
+# shared by every board. Returns (grids, ok, rounds): the propagated grids, False where a board hit
+# a contradiction, and how many rounds each board took to stop changing
+def propagate_singles(grids, labels, max_rounds=None):
+    grids = np.array(grids, dtype=np.uint8)
+    n_boards, size = grids.shape[0], grids.shape[1]
+    labels = np.broadcast_to(np.asarray(labels), grids.shape)
+    if size > 32:
+        raise ValueError('size must be at most 32')
+    full = np.uint32((1 << size) - 1)
+    units = unit_cells(labels)
+    # the three units each cell sits in, as indices into the unit axis
+    cell_unit = np.empty((n_boards, size*size, 3), dtype=np.int64)
+    b_idx = np.arange(n_boards)[:, None]
+    u_idx = np.arange(3*size)
+    for k in range(0, 3):
+        block = slice(k*size, (k + 1)*size)
+        cell_unit[b_idx, units[:, block].reshape(n_boards, -1), k] = np.repeat(u_idx[block], size)[None, :]
+    digits = np.arange(size, dtype=np.uint32)
+    values = grids.reshape(n_boards, -1).astype(np.int64)
+    ok = np.ones(n_boards, dtype=bool)
+    rounds = np.zeros(n_boards, dtype=np.int64)
+    active = np.ones(n_boards, dtype=bool)
+    while active.any() and (max_rounds is None or rounds.max() < max_rounds):
+        a = np.nonzero(active)[0]
+        v = values[a]
+        ab = np.arange(len(a))[:, None]
+        bits = np.where(v > 0, np.left_shift(np.uint32(1), (v - 1).clip(0).astype(np.uint32)), np.uint32(0))
+        unit_bits = bits[ab[:, :, None], units[a]]
+        # digits placed in each unit; a repeat shows up as fewer bits than placed cells
+        used = np.bitwise_or.reduce(unit_bits, axis=2)
+        bad = (popcount(used) != (unit_bits > 0).sum(axis=2)).any(axis=1)
+        cu = cell_unit[a]
+        taken = used[ab, cu[..., 0]] | used[ab, cu[..., 1]] | used[ab, cu[..., 2]]
+        cands = np.where(v > 0, np.uint32(0), full & ~taken)
+        bad |= ((v == 0) & (cands == 0)).any(axis=1)
+        # naked singles
+        naked = (v == 0) & (popcount(cands) == 1)
+        new_bits = np.where(naked, cands, np.uint32(0))
+        # hidden singles: a digit missing from a unit with exactly one candidate cell
+        unit_cands = cands[ab[:, :, None], units[a]]
+        has = (unit_cands[..., None] >> digits) & 1
+        counts = has.sum(axis=2)
+        missing = ((used[..., None] >> digits) & 1) == 0
+        bad |= (missing & (counts == 0)).any(axis=(1, 2))
+        hb, hu, hd = np.nonzero(missing & (counts == 1))
+        hc = units[a][hb, hu, has[hb, hu, :, hd].argmax(axis=1)]
+        np.bitwise_or.at(new_bits, (hb, hc), np.left_shift(np.uint32(1), hd.astype(np.uint32)))
+        # a cell forced to two digits at once
+        bad |= (popcount(new_bits) > 1).any(axis=1)
+        changed = (new_bits > 0).any(axis=1) & ~bad
+        set_v = np.where(new_bits > 0, np.log2(np.maximum(new_bits, 1)).astype(np.int64) + 1, 0)
+        values[a] = np.where(changed[:, None] & (new_bits > 0), set_v, v)
+        ok[a[bad]] = False
+        rounds[a[changed]] += 1
+        active[a[~changed]] = False
+    return values.reshape(grids.shape).astype(np.uint8), ok, rounds
+
+
+# Solve a (N, size, size) stack of partial grids. Singles are propagated for the whole batch with
+# array operations; boards still open afterwards go to a per-board backtracker. Returns
+# (solutions, status, rounds): blank-free grids (zeros where unsolvable), a status per board
+# (UNSOLVABLE, SOLVED_BY_SINGLES or SOLVED_BY_SEARCH) and the propagation rounds used
+def solve_batch(grids, labels):
+    grids = np.asarray(grids)
+    labels = np.broadcast_to(np.asarray(labels), grids.shape)
+    out, ok, rounds = propagate_singles(grids, labels)
+    status = np.where(ok, SOLVED_BY_SINGLES, UNSOLVABLE).astype(np.int8)
+    open_boards = np.nonzero(ok & (out == 0).reshape(len(out), -1).any(axis=1))[0]
+    for i in open_boards:
+        solution = solve(out[i], labels[i])
+        if solution is None:
+            status[i] = UNSOLVABLE
+        else:
+            out[i] = solution
+            status[i] = SOLVED_BY_SEARCH
+    out[status == UNSOLVABLE] = 0
+    return out, status, rounds
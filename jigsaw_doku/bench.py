@@ -0,0 +1,224 @@
+# Benchmark harness: layout and value generation across sizes with fixed seeds.
+#
+#   python -m jigsaw_doku.bench --sizes 4 6 9 12 16 --runs 20 --out bench.json
+#   python -m jigsaw_doku.bench --cases layout_grid --baseline bench.json
+#
+# Each (case, size) is run once per seed 0..runs-1, after the case's SETUP if any. Wall time
+# comes from untraced runs; peak memory from one extra run of the first seed that finished,
+# under tracemalloc. Results are written as sorted-key JSON so two runs can be diffed, or
+# compared directly with --baseline. Sizes a case doesn't support are skipped (see `supported`)
+import argparse, json, platform, random, signal, subprocess, sys, time, tracemalloc
+from contextlib import contextmanager
+import numpy as np
+from .jigsaw_board import JigsawChain, JigsawGrid, JigsawSudoku, box_shape
+from .jigsaw_values import SudokuValues
+from .large import LargeBoard
+from .tiling import JigsawTiling, MAX_SIZE as TILING_MAX_SIZE, get_catalog
+from .utils import divide_region
+
+SIZES = (4, 6, 9, 12, 16)
+
+
+# A run went over its deadline. Derived from BaseException so generator code that retries on
+# Exception doesn't swallow it
+class BenchTimeout(BaseException):
+    pass
+
+
+# Raise BenchTimeout after `seconds` of wall time (no deadline where SIGALRM isn't available)
+@contextmanager
+def deadline(seconds):
+    if seconds is None or not hasattr(signal, 'setitimer'):
+        yield
+        return
+
+    def expire(signum, frame):
+        raise BenchTimeout
+
+    previous = signal.signal(signal.SIGALRM, expire)
+    signal.setitimer(signal.ITIMER_REAL, seconds)
+    try:
+        yield
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, previous)
+
+
+# Cases: each runs one generation for (size, seed) and returns the attempts it took
+def bench_layout_sudoku(size, seed):
+    j = JigsawSudoku(size=size, rng=random.Random(seed))
+    return j.stats.restarts + 1
+
+
+def bench_layout_grid(size, seed):
+    g = JigsawGrid(size=size, rng=random.Random(seed))
+    return g.stats.restarts + 1
+
+
+# boundary-swap chain from the standard partition (never restarts)
+def bench_layout_chain(size, seed):
+    JigsawChain(size=size, rng=random.Random(seed))
+    return 1
+
+
+# exact cover over the placement catalog (sizes up to 10; the catalog is loaded in SETUP)
+def bench_layout_tiling(size, seed):
+    t = JigsawTiling(size=size, rng=random.Random(seed))
+    return t.stats.restarts + 1
+
+
+def bench_values(size, seed):
+    s = SudokuValues(size=size, rng=random.Random(seed))
+    return s.stats.attempts
+
+
+# layout and digits together (sizes with a box shape)
+def bench_large(size, seed):
+    LargeBoard(size=size, rng=random.Random(seed))
+    return 1
+
+
+# utils geometry helpers over every region of a layout
+def bench_geometry(size, seed):
+    regions = JigsawGrid(size=size, rng=random.Random(seed)).regions
+    for r in regions.values():
+        divide_region(r.shape)
+    return 1
+
+
+CASES = {
+    'layout_sudoku': bench_layout_sudoku,
+    'layout_grid': bench_layout_grid,
+    'layout_chain': bench_layout_chain,
+    'layout_tiling': bench_layout_tiling,
+    'values': bench_values,
+    'large': bench_large,
+    'geometry': bench_geometry,
+}
+
+# Largest size a case supports (cases not listed take any size). The values search is heavy-tailed
+# beyond 9x9, where most runs only reach the deadline
+MAX_SIZES = {'layout_tiling': TILING_MAX_SIZE, 'values': 9}
+
+# Cases that need a size with a box shape (not prime)
+BOX_CASES = ('large',)
+
+
+# True if `run` should time the case at this size
+def supported(name, size):
+    return size <= MAX_SIZES.get(name, size) and (name not in BOX_CASES or box_shape(size) is not None)
+
+# Untimed per-size setup run before a case's timed runs, for one-off costs such as loading caches
+SETUP = {'layout_tiling': get_catalog}
+
+
+# Time `runs` seeded calls of one case; a run over `timeout` seconds counts as a failure
+def run_case(name, size, runs=20, seed=0, timeout=10.0):
+    fn = CASES[name]
+    times, attempts, failures, ok_seed = list(), 0, 0, None
+    if name in SETUP:
+        SETUP[name](size)
+    for s in range(seed, seed + runs):
+        start = time.perf_counter()
+        try:
+            with deadline(timeout):
+                attempts += fn(size, s)
+        except BenchTimeout:
+            failures += 1
+            continue
+        times.append(time.perf_counter() - start)
+        ok_seed = s if ok_seed is None else ok_seed
+    peak = None
+    if ok_seed is not None:
+        # replay the first seed that finished, so the traced run isn't cut off by the deadline
+        tracemalloc.start()
+        try:
+            with deadline(timeout*4):
+                fn(size, ok_seed)
+            peak = tracemalloc.get_traced_memory()[1]
+        except BenchTimeout:
+            pass
+        finally:
+            tracemalloc.stop()
+    result = dict(case=name, size=size, runs=runs, failures=failures,
+        attempts_per_success=attempts/len(times) if times else None,
+        peak_kib=None if peak is None else round(peak/1024, 1))
+    if times:
+        ms = np.array(times)*1000
+        p50, p95, p99 = np.percentile(ms, [50, 95, 99])
+        result.update(median_ms=round(float(p50), 3), p95_ms=round(float(p95), 3),
+            p99_ms=round(float(p99), 3), mean_ms=round(float(ms.mean()), 3))
+    else:
+        result.update(median_ms=None, p95_ms=None, p99_ms=None, mean_ms=None)
+    return result
+
+
+# Interpreter/library versions and the current commit, so results files are self-describing
+def environment():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+            text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return dict(python=platform.python_version(), numpy=np.__version__, machine=platform.machine(),
+        platform=platform.platform(), commit=commit)
+
+
+def run(cases=None, sizes=SIZES, runs=20, seed=0, timeout=10.0, progress=None):
+    cases = list(CASES) if cases is None else cases
+    results = list()
+    for name in cases:
+        for size in sizes:
+            if not supported(name, size):
+                continue
+            result = run_case(name, size, runs=runs, seed=seed, timeout=timeout)
+            if progress is not None:
+                progress(result)
+            results.append(result)
+    return dict(environment=environment(), seed=seed, runs=runs, timeout=timeout, results=results)
+
+
+def format_row(result, baseline=None):
+    def ms(v):
+        return '{:>10}'.format('-' if v is None else '{:.3f}'.format(v))
+    row = '{:<14}{:>5}{}{}{}{:>10}{:>8}{:>10}'.format(result['case'], result['size'],
+        ms(result['median_ms']), ms(result['p95_ms']), ms(result['p99_ms']),
+        '-' if result['peak_kib'] is None else result['peak_kib'], result['failures'],
+        '-' if result['attempts_per_success'] is None else round(result['attempts_per_success'], 2))
+    if baseline is not None:
+        old = baseline.get((result['case'], result['size']))
+        if old and old['median_ms'] and result['median_ms']:
+            row += '{:>9.2f}x'.format(result['median_ms']/old['median_ms'])
+    return row
+
+
+HEADER = '{:<14}{:>5}{:>10}{:>10}{:>10}{:>10}{:>8}{:>10}'.format('case', 'size', 'median ms',
+    'p95 ms', 'p99 ms', 'peak KiB', 'fails', 'attempts')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m jigsaw_doku.bench', description='Benchmark layout and value generation')
+    parser.add_argument('--cases', nargs='+', choices=list(CASES), default=None)
+    parser.add_argument('--sizes', nargs='+', type=int, default=list(SIZES))
+    parser.add_argument('--runs', type=int, default=20, help='seeded runs per case and size')
+    parser.add_argument('--seed', type=int, default=0, help='first seed')
+    parser.add_argument('--timeout', type=float, default=10.0, help='seconds before a run counts as failed')
+    parser.add_argument('--out', default=None, help='write results as JSON to this file')
+    parser.add_argument('--baseline', default=None, help='earlier results JSON to compare medians against')
+    args = parser.parse_args(argv)
+    baseline = None
+    if args.baseline is not None:
+        with open(args.baseline) as f:
+            baseline = {(r['case'], r['size']): r for r in json.load(f)['results']}
+    print(HEADER + ('  vs base' if baseline else ''))
+    report = run(cases=args.cases, sizes=args.sizes, runs=args.runs, seed=args.seed, timeout=args.timeout,
+        progress=lambda r: print(format_row(r, baseline), flush=True))
+    if args.out is not None:
+        with open(args.out, 'w') as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+            f.write('\n')
+    return report
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,214 @@
+# Exact-cover (Algorithm X / dancing links) solver for filling digits into a region layout
+import numpy as np
+from .utils import as_random
+
+# default cap on rows tried by `solve`
+MAX_NODES = 200000
+
+
+class DancingLinks:
+
+    # `rows` is a list of column-index lists; node 0 is the root, nodes 1..n_columns are column headers
+    def __init__(self, n_columns, rows):
+        self.n_columns = n_columns
+        n = n_columns + 1
+        self.L = [i - 1 for i in range(0, n)]
+        self.R = [i + 1 for i in range(0, n)]
+        self.L[0], self.R[n_columns] = n_columns, 0
+        self.U = list(range(0, n))
+        self.D = list(range(0, n))
+        self.C = list(range(0, n))
+        self.S = [0]*n
+        self.row_of = [-1]*n
+        self.row_start = list()
+        for r, columns in enumerate(rows):
+            first = None
+            for c in columns:
+                c += 1
+                node = len(self.C)
+                self.C.append(c)
+                self.row_of.append(r)
+                # vertical: append at the bottom of column c
+                self.U.append(self.U[c])
+                self.D.append(c)
+                self.D[self.U[c]] = node
+                self.U[c] = node
+                self.S[c] += 1
+                # horizontal: append at the end of the row
+                if first is None:
+                    first = node
+                    self.L.append(node)
+                    self.R.append(node)
+                else:
+                    self.L.append(self.L[first])
+                    self.R.append(first)
+                    self.R[self.L[first]] = node
+                    self.L[first] = node
+            self.row_start.append(first)
+
+    def cover(self, c):
+        L, R, U, D, C, S = self.L, self.R, self.U, self.D, self.C, self.S
+        R[L[c]], L[R[c]] = R[c], L[c]
+        i = D[c]
+        while i != c:
+            j = R[i]
+            while j != i:
+                D[U[j]], U[D[j]] = D[j], U[j]
+                S[C[j]] -= 1
+                j = R[j]
+            i = D[i]
+
+    def uncover(self, c):
+        L, R, U, D, C, S = self.L, self.R, self.U, self.D, self.C, self.S
+        i = U[c]
+        while i != c:
+            j = L[i]
+            while j != i:
+                S[C[j]] += 1
+                D[U[j]] = U[D[j]] = j
+                j = L[j]
+            i = U[i]
+        R[L[c]] = L[R[c]] = c
+
+    # Take a row as part of the solution up front (e.g. a given digit)
+    def select(self, r):
+        node = self.row_start[r]
+        if self.L[self.R[self.C[node]]] != self.C[node]:
+            # one of its columns has already been covered
+            return False
+        j = node
+        while True:
+            c = self.C[j]
+            if self.L[self.R[c]] != c:
+                return False
+            self.cover(c)
+            j = self.R[j]
+            if j == node:
+                return True
+
+    # Yield each exact cover as a list of row indices. Rows are tried in random order when `rng`
+    # is given; raises TimeoutError after `max_nodes` rows have been tried
+    def search(self, rng=None, max_nodes=None):
+        solution = list()
+        nodes = [0]
+
+        def recurse():
+            R, D, C, S = self.R, self.D, self.C, self.S
+            if R[0] == 0:
+                yield list(solution)
+                return
+            # column with the fewest remaining rows
+            c, j = R[0], R[0]
+            while j != 0:
+                if S[j] < S[c]:
+                    c = j
+                    if S[c] == 0:
+                        return
+                j = R[j]
+            if S[c] == 0:
+                return
+            rows = list()
+            i = D[c]
+            while i != c:
+                rows.append(i)
+                i = D[i]
+            if rng is not None:
+                rng.shuffle(rows)
+            self.cover(c)
+            for i in rows:
+                nodes[0] += 1
+                if max_nodes is not None and nodes[0] > max_nodes:
+                    raise TimeoutError
+                solution.append(self.row_of[i])
+                j = R[i]
+                while j != i:
+                    self.cover(C[j])
+                    j = R[j]
+                yield from recurse()
+                j = self.L[i]
+                while j != i:
+                    self.uncover(C[j])
+                    j = self.L[j]
+                solution.pop()
+            self.uncover(c)
+
+        yield from recurse()
+
+
+# Candidate (x, y, digit) rows and their four constraint columns: one digit per cell, and each
+# digit once per x line, per y line and per region. `labels` holds region #s 1..size
+def sudoku_rows(labels):
+    size = labels.shape[0]
+    n2 = size*size
+    region = labels.astype(np.int64) - 1
+    rows, options = list(), list()
+    for x in range(0, size):
+        for y in range(0, size):
+            r = int(region[x, y])
+            for d in range(0, size):
+                options.append((x, y, d + 1))
+                rows.append((x*size + y, n2 + x*size + d, 2*n2 + y*size + d, 3*n2 + r*size + d))
+    return rows, options
+
+
+# Links for the layout with any non-zero `givens` already selected (None if the givens clash),
+# plus the (x, y, digit) option for each row
+def build_links(labels, givens=None):
+    labels = np.asarray(labels)
+    size = labels.shape[0]
+    if labels.shape != (size, size) or sorted(np.bincount(labels.ravel(), minlength=size + 1)[1:]) != [size]*size:
+        raise ValueError('labels must be a square grid of regions 1..size with size cells each')
+    rows, options = sudoku_rows(labels)
+    links = DancingLinks(4*size*size, rows)
+    if givens is not None:
+        for (x, y), d in np.ndenumerate(np.asarray(givens)):
+            if d != 0 and not links.select((x*size + y)*size + int(d) - 1):
+                return None, options
+    return links, options
+
+
+# Digit grid (indexed like `labels`) from the selected rows
+def to_grid(solution, options, size, givens=None):
+    grid = np.zeros((size, size), dtype=np.uint8) if givens is None else np.array(givens, dtype=np.uint8)
+    for r in solution:
+        x, y, d = options[r]
+        grid[x, y] = d
+    return grid
+
+
+# Yield full digit grids (indexed like `labels`) that fill the layout, keeping any non-zero `givens`
+def solutions(labels, givens=None, rng=None, max_nodes=None):
+    links, options = build_links(labels, givens)
+    if links is None:
+        return
+    for solution in links.search(rng=rng, max_nodes=max_nodes):
+        yield to_grid(solution, options, len(labels), givens)
+
+
+# One random digit grid for the layout, or None once a full search shows there is none. Random
+# search is heavy-tailed, so it restarts with a fresh row order after `restart_nodes` rows,
+# doubling the budget each time. A layout without a fill can take far longer to rule out than a
+# fill takes to find, so the search raises TimeoutError once `max_nodes` rows have been tried in
+# total (about 2 s at the default on 9x9); TimeoutError means undecided, not "no fill".
+# `max_nodes=None` searches until it decides
+def solve(labels, givens=None, rng=None, max_nodes=MAX_NODES, restart_nodes=1000):
+    rng = as_random(rng)
+    links, options = build_links(labels, givens)
+    if links is None:
+        return None
+    start = [list(a) for a in (links.L, links.R, links.U, links.D, links.S)]
+    budget, spent = restart_nodes, 0
+    while True:
+        if max_nodes is not None:
+            if spent >= max_nodes:
+                raise TimeoutError
+            budget = min(budget, max_nodes - spent)
+        try:
+            for solution in links.search(rng=rng, max_nodes=budget):
+                return to_grid(solution, options, len(labels), givens)
+            return None
+        except TimeoutError:
+            spent += budget
+            budget *= 2
+            for a, b in zip((links.L, links.R, links.U, links.D, links.S), start):
+                a[:] = b
@@ -1,21 +1,34 @@
 # Jigsaw sudoku
-import sys, functools, operator, time
-sys.path.insert(0,'jigsaw_doku')
-from utils import *
-from random import choice
-from shapely.geometry import Polygon, box, Point, MultiPolygon
-from shapely.ops import unary_union
+import time, logging
+import numpy as np
 from itertools import product
+from .utils import FreeSpace, as_random, grid_neighbours, flat_neighbours, flat_connected, trade_cells, box, Point, unary_union, is_polygon
+from .stats import GenerationStats
+
+logger = logging.getLogger(__name__)
+
+
+# Stats phase for generating the next region when `n_done` of `size` are complete
+def region_phase(n_done, size):
+    if n_done == 0:
+        return 'first_region'
+    elif n_done == size - 1:
+        return 'final_region'
+    return 'middle_regions'
 
 
 
 class JigsawSudoku:
 
-    def __init__(self, size=9, auto_generate=True, timeout=10):
+    def __init__(self, size=9, auto_generate=True, timeout=10, rng=None, stats=None):
         self.size = size
+        # counters and phase timings (see `GenerationStats`); pass one in to attach callbacks
+        self.stats = GenerationStats() if stats is None else stats
+        # random source (an int seed, or anything with `choice`, e.g. `random.Random(seed)`); see `as_random`
+        self.rng = as_random(rng)
         # initiated as empty rows/columns
-        self.rows = dict(zip(list(range(1, self.size + 1)), [None]*len(keys)))
-        self.columns = dict(zip(list(range(1, self.size + 1)), [None]*len(keys)))
+        self.rows = dict(zip(list(range(1, self.size + 1)), [None]*self.size))
+        self.columns = dict(zip(list(range(1, self.size + 1)), [None]*self.size))
         self.left_grid_ext = [(x, y) for x, y in zip([0]*(size + 1), range(0, size + 1))]
         self.right_grid_ext = [(x, y) for x, y in zip([size]*(size + 1), range(0, size + 1))]
         self.top_grid_ext = [(x, y) for x, y in zip(range(0, size + 1), [0]*(size + 1))]
@@ -28,51 +41,91 @@ class JigsawSudoku:
                 Cell(box(self.size-1, self.size-1, self.size, self.size)), # top right
                 Cell(box(self.size - 1, 0, self.size, 1)) # bottom right
                 ]
+        # coordinate-keyed lookups: (x, y) -> Cell, and (x, y) -> neighbouring (x, y)s
+        self.cell_index = {c.coord: c for c in self.all_cells}
+        self.adjacent = grid_neighbours(self.size)
+        # seconds per attempt at a whole layout (None = no limit); checked between regions
+        self.timeout = timeout
         if auto_generate is True:
             generation_status = False
-            self.timeout = timeout
-            global PUZZLE_GEN_START_TIME
             while generation_status is False:
                 # Reset regions/available spaces if needed
-                self.regions = dict()
-                self.available_region = unary_union(self.all_cells)
-                self.available_cells = self.all_cells
-                # start timing
-                PUZZLE_GEN_START_TIME = time.time()
+                self.reset_available()
                 try:
                     self.generate_all_regions()
                     generation_status = True
-                except (ValueError, TimeoutError, IndexError):
+                except (ValueError, TimeoutError, IndexError) as e:
+                    self.stats.restart(reason=type(e).__name__)
                     continue
         else:
-            self.regions = dict()
-            self.available_region = unary_union(self.all_cells)
-            self.available_cells = self.all_cells
+            self.reset_available()
             
 
     # Automatically generate puzzles   
     def auto_generate_puzzles(self):
         self.generate_all_regions(n=self.size)
 
+    # Empty board: no regions, every cell free
+    def reset_available(self):
+        self.regions = dict()
+        # connected pieces of free space, cells in completed regions, free cells touching a
+        # completed region, and free cells touching the region currently being grown (all as (x, y))
+        self.space = FreeSpace(self.size)
+        self.used = set()
+        self.border = set()
+        self.frontier = set()
+
+    # Copy of the state between regions (the frontier is always empty there). Regions are never
+    # mutated once built, so a shallow copy of the dict is enough
+    def snapshot(self):
+        return (dict(self.regions), self.space.copy(), set(self.used), set(self.border))
+
+    # Go back to a snapshot, leaving the snapshot itself untouched so it can be restored again
+    def restore(self, state):
+        regions, space, used, border = state
+        self.regions = dict(regions)
+        self.space = space.copy()
+        self.used = set(used)
+        self.border = set(border)
+        self.frontier = set()
+
+    # free cells (as (x, y))
+    @property
+    def free(self):
+        return self.space.piece.keys()
+
+    # cells not yet in any region
+    @property
+    def available_cells(self):
+        return [self.cell_index[c] for c in self.free]
+
+    # space not yet in any region (only built when asked for)
+    @property
+    def available_region(self):
+        return unary_union(self.available_cells)
+
     # cells currently used to define any existing (completed) regions
     def cells_in_regions(self):
-        return functools.reduce(operator.iconcat, [region.cells for region in self.regions.values()], [])
+        return [self.cell_index[c] for c in self.used]
 
-    # update any available space/cells to exclude a new cell
+    # update any available space/cells to exclude a new cell (added to the region being grown)
     def update_available(self, cell):
-        self.available_cells = [c for c in self.available_cells if c.__str__() != cell.__str__()]
-        self.available_region = self.available_region.difference(cell)
+        self.space.take(cell.coord)
+        self.border.discard(cell.coord)
+        self.frontier.discard(cell.coord)
+        self.frontier.update(c for c in self.adjacent[cell.coord] if c in self.space)
 
+    # Record a completed region and start a fresh frontier for the next one
+    def complete_region(self, k, cells):
+        self.regions.update({k : Region(cells=cells)})
+        for cell in cells:
+            self.used.add(cell.coord)
+            self.border.update(c for c in self.adjacent[cell.coord] if c in self.space)
+        self.frontier = set()
 
-    # Get open spots to append new cells to a region (exclude exterior, or spaces already used - by itself or another region)
-    def get_available(self, cells, exclude=[]):
-        cells_str = [c.__str__() for c in cells]
-        exclude_str = [c.__str__() for c in exclude]
-        exclude_str = [c.__str__() for c in self.cells_in_regions() if c.__str__() not in exclude_str]
-        not_used = [cell for cell in self.available_cells if cell.__str__() not in cells_str and cell.__str__() not in exclude_str]
-        available = [c[1] for c in list(product(cells, not_used)) if len(
-            set(c[0].boundary.coords).intersection(c[1].boundary.coords)) > 0]
-        return available
+    # Get open spots to append new cells to a region (from its frontier, less any exclusions)
+    def get_available(self, frontier, exclude=()):
+        return [self.cell_index[c] for c in frontier if c not in exclude]
 
     # Generate new cell from available cells
     def rand_cell(self, available):
@@ -82,24 +135,30 @@ class JigsawSudoku:
             logger.error('Error: Available = {}'.format(available))
             raise IndexError
         else:
-            out = choice(available)
+            out = self.rng.choice(available)
         return out
     
     # start first cell at random corder
     def set_first_cell(self):
-        cell = choice(self.corners)
+        cell = self.rng.choice(self.corners)
         cells = [cell]
         # Define remaining available space/cells
         self.update_available(cell)
         return cells
 
+    # add a cell, and any cut-off holes (as (x, y)) it brings with it, to the region
+    def take_cells(self, cell, absorb, cells, iter, start_len=0):
+        for c in [cell] + [self.cell_index[a] for a in absorb]:
+            cells, iter, complete_status = self.update_cell(c, cells, iter, start_len)
+        return cells, iter, complete_status
+
     def update_cell(self, cell, cells, iter, start_len=0):
         cells.append(cell)
         iter += 1
         # Update available region & cells
         self.update_available(cell)
         if iter == self.size:
-            self.regions.update({start_len + 1 : Region(cells=cells)})
+            self.complete_region(start_len + 1, cells)
             complete_status = True
         else:
             complete_status = False
@@ -110,52 +169,37 @@ class JigsawSudoku:
         cells = self.set_first_cell()
         # Begin iteratively/randomly generating cells in available space
         iter = 1
-        exclude = list()
+        exclude = set()
         complete_status = False
         while complete_status is False:
-            if time.time() - PUZZLE_GEN_START_TIME >= self.timeout:
-                raise TimeoutError
             # new random (available and adjacent) cell
-            available = self.get_available(cells, exclude=exclude)
+            available = self.get_available(self.frontier, exclude=exclude)
             cell = self.rand_cell(available)
-            # Do some checks to see if there are issues with the selected cell
+            self.stats.cells_tried += 1
+            # Make sure the cell doesn't cut off free space that can't become whole regions
             # Append to exclusions if necessary to prevent the same error from happening again
-            # Confirm the cell is adjacent
-            if type(unary_union(cells + [cell])) != Polygon:
-                    exclude.append(cell)
-            # Confirm that the cell is within the available region
-            elif not cell.center.within(self.available_region):
-                exclude.append(cell)
-            # Confirm that if a MultiPolygon is created, its area is not less than 9
-            elif type(self.available_region.difference(cell)) == MultiPolygon:
-                for sub_region in self.available_region.difference(cell).geoms:
-                    any_less = 0
-                    if sub_region.area < self.size:
-                        exclude.append(cell)
-                        any_less += 1
-                # only if no sub-regions are less than 9 is this ok
-                if any_less == 0:
-                    cells, iter, complete_status = self.update_cell(cell, cells, iter)
+            absorb = self.space.check_take(cell.coord, self.size - iter - 1)
+            if absorb is None:
+                exclude.add(cell.coord)
+                self.stats.exclusions += 1
             else:
-                cells, iter, complete_status = self.update_cell(cell, cells, iter)
+                cells, iter, complete_status = self.take_cells(cell, absorb, cells, iter)
                 
     def gen_middle_region_start(self, exclude, start_len):
         # corners first
         if start_len in range(1,4):
-            cell = choice([c for c in self.corners if c.__str__() in [ac.__str__() for ac in self.available_cells]])
+            cell = self.rng.choice([c for c in self.corners if c.coord in self.free])
             self.update_available(cell)
             cells = [cell]
         else:
             start_acquired = False
             while start_acquired is False:
-                if time.time() - PUZZLE_GEN_START_TIME >= self.timeout:
-                    raise TimeoutError
-                available = self.get_available(cells=self.cells_in_regions())
+                available = self.get_available(self.border, exclude=exclude)
                 cell = self.rand_cell(available)
-                if type(self.available_region.difference(cell)) != Polygon:
-                    exclude.append(cell)
-                elif cell not in self.available_cells:
-                    exclude.append(cell)
+                self.stats.cells_tried += 1
+                if len(self.space.split_sizes(cell.coord)) > 1:
+                    exclude.add(cell.coord)
+                    self.stats.exclusions += 1
                 else:
                     self.update_available(cell)
                     cells = [cell]
@@ -170,88 +214,98 @@ class JigsawSudoku:
         iter = 1
         complete_status = False
         while complete_status is False:
-            if time.time() - PUZZLE_GEN_START_TIME >= self.timeout:
-                raise TimeoutError
             # new random (available and adjacent) cell
-            available = self.get_available(cells, exclude=exclude)
+            available = self.get_available(self.frontier, exclude=exclude)
             cell = self.rand_cell(available)
-            # Do some checks to see if there are issues with the selected cell
-            # Append to exclusions if necessary to prevent the same error from happening again
-            if type(self.available_region.difference(cell)) == MultiPolygon:
-                # Rather than excluding without doing any checks, see if it is possible to "fill in the hole"
-                # if possible, fill hole. Otherwise exclude
-                sub_regions = self.available_region.difference(cell)
-                possible_sub_region = False
-                for i in range(0, len(sub_regions.geoms)):
-                    r = sub_regions.geoms[i]
-                    if r.area < self.size - iter:
-                        possible_sub_region = True
-                        sub_r_cells = [Cell(c) for c in divide_region(r)]
-                        cells += sub_r_cells
-                        for c in sub_r_cells:
-                            self.update_available(c)
-                        iter += r.area
-                        if iter == self.size:
-                            self.regions.update({start_len + 1 : Region(cells=cells)})
-                            complete_status = True
-                        break  
-                    elif r.area == self.size:
-                        possible_sub_region = True
-                        sub_r_cells = [Cell(c) for c in divide_region(r)]
-                        cells = sub_r_cells
-                        for c in sub_r_cells:
-                            self.update_available(c)
-                        self.regions.update({start_len + 1 : Region(cells=cells)})
-                        complete_status = True
-                        break
-                # if no possible sub-region, exclude
-                if possible_sub_region is False:
-                    exclude.append(cell)
-            elif type(unary_union(cells + [cell])) == MultiPolygon:
-                # Not necessarily an exclusion - it might be able to connect later
-                continue
-                # See if they can connect!
-                #connections = [c[1] for c in list(product([cell], cells)) if len(set(c[0].boundary.coords).intersection(c[1].boundary.coords)) > 0]
-                #if len(connections) > 0:
-            elif cell not in self.available_cells:
-                exclude.append(cell)
+            self.stats.cells_tried += 1
+            # Make sure the cell doesn't cut off free space that can't become whole regions.
+            # Rather than excluding without doing any checks, see if it is possible to "fill in the hole"
+            # if possible, fill hole. Otherwise exclude
+            absorb = self.space.check_take(cell.coord, self.size - iter - 1)
+            if absorb is None:
+                exclude.add(cell.coord)
+                self.stats.exclusions += 1
             else:
-                cells, iter, complete_status = self.update_cell(cell, cells, iter, start_len)
+                cells, iter, complete_status = self.take_cells(cell, absorb, cells, iter, start_len)
 
     # Generate region where len(regions) > 0
     def gen_next_region(self):
-        # Exclude cells in completed regions
-        exclude = self.cells_in_regions()
+        # Cells in completed regions are never on a frontier, so exclusions start empty
+        exclude = set()
         # Count of completed regions
         start_len = len(self.regions)
-        # This means there is an isolated "available region" somewhere
-        if type(self.available_region) == MultiPolygon:
-            # TODO
-            logger.warning('`available_region` is not a Polygon')
-            pass
+        # This means there is an isolated piece of free space that can't be split into regions
+        # (the cell checks should prevent this - prune the layout rather than carry on)
+        if any(n % self.size != 0 for n in self.space.piece_sizes()):
+            logger.warning('free space can no longer be divided into regions')
+            raise ValueError
         else:
             # Final region - if correctly done, this should just be filled in 
-            if self.available_region.area == self.size and start_len == self.size - 1:
+            if len(self.space) == self.size and start_len == self.size - 1:
                 # Update regions dict with region #, and Region object 
-                self.regions.update({start_len + 1 : Region(cells=self.available_cells)})
-                self.available_region = None
-                self.available_cells = None
+                cells = self.available_cells
+                for cell in cells:
+                    self.space.take(cell.coord)
+                self.complete_region(start_len + 1, cells)
             # This shouldn't happen
             # TODO
-            elif self.available_region.area != self.size and start_len == self.size - 1:
+            elif len(self.space) != self.size and start_len == self.size - 1:
                 #logger.error("The area of the final region != {}".format(self.size))
                 raise ValueError
             # Not the first or final region being filled - primary case
             else:
                 self.gen_next_middle_region(exclude, start_len)
     
-    # Generate all regions (main function)
-    def generate_all_regions(self, n=None):
+    # Generate all regions (main function), raising TimeoutError if that takes longer than
+    # `timeout` seconds (defaults to `self.timeout`; a board timeout of None means no limit). The
+    # clock is only read between region steps, each of which is bounded
+    def generate_all_regions(self, n=None, max_retries=None, max_failures=None, timeout=None):
+        timeout = self.timeout if timeout is None else timeout
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for _ in self.iter_regions(n, max_retries=max_retries, max_failures=max_failures):
+            if deadline is not None and time.monotonic() >= deadline:
+                raise TimeoutError
+
+    # Grow regions one step at a time, yielding the number of completed regions after each step
+    # (a region built, or a failed one rolled back) until there are `n`. The state before each
+    # region is kept on an undo stack: when a region fails, only that region is rolled back and
+    # retried. After `max_retries` failures at the same point, the region before it is rolled
+    # back as well. A bad early region can make that search very long, so after `max_failures`
+    # failures in all it starts over from an empty board. Callers can stop between steps (see
+    # `aio.generate_layout`)
+    def iter_regions(self, n=None, max_retries=None, max_failures=None):
         if n is None:
             n = self.size
-        self.gen_first_region()
+        if max_retries is None:
+            max_retries = 1
+        if max_failures is None:
+            max_failures = self.size
+        undo = [self.snapshot()]
+        fails = [0]
+        total = 0
         while len(self.regions) < n:
-            self.gen_next_region()
+            try:
+                with self.stats.phase(region_phase(len(self.regions), self.size)):
+                    if len(self.regions) == 0:
+                        self.gen_first_region()
+                    else:
+                        self.gen_next_region()
+            except (ValueError, IndexError):
+                fails[-1] += 1
+                total += 1
+                if total > max_failures:
+                    undo, fails, total = undo[:1], [0], 0
+                while fails[-1] > max_retries and len(undo) > 1:
+                    undo.pop()
+                    fails.pop()
+                    fails[-1] += 1
+                self.stats.backtrack(regions=len(self.regions) - len(undo[-1][0]))
+                self.restore(undo[-1])
+                yield len(self.regions)
+                continue
+            undo.append(self.snapshot())
+            fails.append(0)
+            yield len(self.regions)
 
 
 
@@ -264,7 +318,7 @@ class Region(JigsawSudoku):
 
 class Cell(JigsawSudoku):
     def __init__(self, shapely_box):
-        if not isinstance(shapely_box, Polygon):
+        if not is_polygon(shapely_box):
             raise TypeError("Cell must be a shapely box (Polygon) of 1x1 dimensions")
         if shapely_box.area != 1:
             raise TypeError("Cell must be a shapely box (Polygon) of 1x1 dimensions")
@@ -280,6 +334,7 @@ class Cell(JigsawSudoku):
         self.row = self.x_start + 1
         self.column = self.y_start + 1
         self.index = (self.row, self.column) #(x,y)
+        self.coord = (int(self.x_start), int(self.y_start))
         self._geom = shapely_box._geom
         self.boundary = shapely_box.boundary
         self.center_coords = (self.x_start + .5, self.y_start + .5)
@@ -287,3 +342,318 @@ class Cell(JigsawSudoku):
 
     def __str__(self):
         return 'box({}, {}, {}, {})'.format(self.x_start, self.y_start, self.x_start + 1, self.y_start + 1)
+
+
+
+# Label grid of region ids (0 = free), indexed [x, y] to match `Cell.x_start`/`Cell.y_start`
+def regions_to_labels(regions, size):
+    labels = np.zeros((size, size), dtype=np.uint8)
+    for k, region in regions.items():
+        for c in region.cells:
+            labels[int(c.x_start), int(c.y_start)] = k
+    return labels
+
+# Regions dict (region # -> Region of Cells) from a label grid
+def labels_to_regions(labels):
+    regions = dict()
+    for k in range(1, int(labels.max()) + 1):
+        cells = [Cell(box(int(x), int(y), int(x)+1, int(y)+1)) for x, y in zip(*np.nonzero(labels == k))]
+        regions.update({k : Region(cells=cells)})
+    return regions
+
+# Box shape (rows, columns) closest to square for a size, or None when there is none (primes)
+def box_shape(size):
+    for h in range(int(size**0.5), 1, -1):
+        if size % h == 0:
+            return h, size // h
+    return None
+
+# Standard partition as a label grid (region # 1..size per [x, y] cell): boxes of `box_shape`,
+# or whole lines for sizes without one
+def start_labels(size):
+    x, y = np.indices((size, size))
+    shape = box_shape(size)
+    if shape is None:
+        return (x + 1).astype(np.uint8)
+    h, w = shape
+    return ((x // h)*h + y // w + 1).astype(np.uint8)
+
+
+class JigsawGrid:
+
+    # Same region growth as `JigsawSudoku`, but the board is held as an integer label grid
+    # (cell -> region #, 0 = free) so no shapely geometry is built until `regions` is read
+    def __init__(self, size=9, auto_generate=True, timeout=10, rng=None, stats=None):
+        self.size = size
+        self.timeout = timeout
+        self.stats = GenerationStats() if stats is None else stats
+        self.rng = as_random(rng)
+        self.corners = [
+                (0, 0), # bottom left
+                (0, self.size-1), # top left
+                (self.size-1, self.size-1), # top right
+                (self.size-1, 0) # bottom right
+                ]
+        self.adjacent = grid_neighbours(self.size)
+        self.reset()
+        if auto_generate is True:
+            generation_status = False
+            while generation_status is False:
+                self.reset()
+                try:
+                    self.generate_all_regions()
+                    generation_status = True
+                except (ValueError, TimeoutError, IndexError) as e:
+                    self.stats.restart(reason=type(e).__name__)
+                    continue
+
+    # Reset the board to all-free
+    def reset(self):
+        self.labels = np.zeros((self.size, self.size), dtype=np.uint8)
+        self.n_regions = 0
+        self.space = FreeSpace(self.size)
+        # free cells touching the region currently being grown
+        self.frontier = set()
+        self._regions = None
+
+    # Copy of the state between regions (see `JigsawSudoku.snapshot`)
+    def snapshot(self):
+        return (self.labels.copy(), self.n_regions, self.space.copy())
+
+    # Go back to a snapshot, leaving the snapshot itself untouched
+    def restore(self, state):
+        labels, n_regions, space = state
+        self.labels = labels.copy()
+        self.n_regions = n_regions
+        self.space = space.copy()
+        self.frontier = set()
+        self._regions = None
+
+    # Regions in the same form as `JigsawSudoku.regions` (built on first access)
+    @property
+    def regions(self):
+        if self._regions is None:
+            self._regions = labels_to_regions(self.labels)
+        return self._regions
+
+    # 4-neighbours of a cell that are on the board
+    def neighbours(self, cell):
+        return self.adjacent[cell]
+
+    # Free cells adjacent to any of `cells`
+    def get_available(self, cells, exclude=()):
+        available = set()
+        for c in cells:
+            available.update(n for n in self.adjacent[c] if self.labels[n] == 0)
+        return [c for c in available if c not in exclude]
+
+    # Connected pieces of free space
+    def free_components(self):
+        return [sorted(m) for m in self.space.members.values()]
+
+    # Check a candidate cell for a region that currently holds `n_cells` cells. Returns the list of
+    # cells in small cut-off pieces that must be absorbed along with it, or None if the cell would
+    # leave free space that can't be divided into regions of `size`
+    def check_cell(self, cell, n_cells):
+        return self.space.check_take(cell, self.size - n_cells - 1)
+
+    # Add cells to the region labelled `k`, keeping its frontier up to date
+    def update_cell(self, cells, k, new):
+        for c in new:
+            self.labels[c] = k
+            self.space.take(c)
+            cells.append(c)
+        for c in new:
+            self.frontier.discard(c)
+            self.frontier.update(n for n in self.adjacent[c] if self.labels[n] == 0)
+        return cells
+
+    # Grow a region from its starting cell(s) until it holds `size` cells
+    def grow_region(self, cells, k, exclude=None):
+        exclude = set() if exclude is None else exclude
+        while len(cells) < self.size:
+            cell = self.rng.choice([c for c in self.frontier if c not in exclude])
+            self.stats.cells_tried += 1
+            absorb = self.check_cell(cell, len(cells))
+            if absorb is None:
+                exclude.add(cell)
+                self.stats.exclusions += 1
+            else:
+                cells = self.update_cell(cells, k, [cell] + absorb)
+        self.n_regions = k
+        self.frontier = set()
+        return cells
+
+    # Generate the first region, starting from a random corner
+    def gen_first_region(self):
+        cell = self.rng.choice(self.corners)
+        self.grow_region(self.update_cell(list(), 1, [cell]), 1)
+
+    # First cell of a middle region: remaining corners first, then a cell touching a completed region
+    def gen_middle_region_start(self, k):
+        exclude = set()
+        corners = [c for c in self.corners if self.labels[c] == 0]
+        while True:
+            if k <= 4 and len(corners) > 0:
+                cell = self.rng.choice(corners)
+                corners.remove(cell)
+            else:
+                used = [(int(x), int(y)) for x, y in zip(*np.nonzero(self.labels))]
+                cell = self.rng.choice(self.get_available(used, exclude=exclude))
+                exclude.add(cell)
+            self.stats.cells_tried += 1
+            absorb = self.check_cell(cell, 0)
+            if absorb is not None:
+                self.frontier = set()
+                return self.update_cell(list(), k, [cell] + absorb)
+
+    # Generate region where n_regions > 0
+    def gen_next_region(self):
+        k = self.n_regions + 1
+        # Final region - the remaining free space
+        if k == self.size:
+            if len(self.space) != self.size or len(self.space.members) != 1:
+                raise ValueError
+            self.labels[self.labels == 0] = k
+            self.space = FreeSpace(self.size, free=())
+            self.n_regions = k
+        else:
+            self.grow_region(self.gen_middle_region_start(k), k)
+
+    # Generate all regions (main function) with the same time limit as
+    # `JigsawSudoku.generate_all_regions`
+    def generate_all_regions(self, n=None, max_retries=None, max_failures=None, timeout=None):
+        timeout = self.timeout if timeout is None else timeout
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for _ in self.iter_regions(n, max_retries=max_retries, max_failures=max_failures):
+            if deadline is not None and time.monotonic() >= deadline:
+                raise TimeoutError
+
+    # Grow regions one step at a time, rolling back failed regions from an undo stack the same
+    # way as `JigsawSudoku.iter_regions`
+    def iter_regions(self, n=None, max_retries=None, max_failures=None):
+        if n is None:
+            n = self.size
+        if max_retries is None:
+            max_retries = 1
+        if max_failures is None:
+            max_failures = self.size
+        undo = [self.snapshot()]
+        fails = [0]
+        total = 0
+        while self.n_regions < n:
+            try:
+                with self.stats.phase(region_phase(self.n_regions, self.size)):
+                    if self.n_regions == 0:
+                        self.gen_first_region()
+                    else:
+                        self.gen_next_region()
+            except (ValueError, IndexError):
+                fails[-1] += 1
+                total += 1
+                if total > max_failures:
+                    undo, fails, total = undo[:1], [0], 0
+                while fails[-1] > max_retries and len(undo) > 1:
+                    undo.pop()
+                    fails.pop()
+                    fails[-1] += 1
+                self.stats.backtrack(regions=self.n_regions - undo[-1][1])
+                self.restore(undo[-1])
+                yield self.n_regions
+                continue
+            undo.append(self.snapshot())
+            fails.append(0)
+            self._regions = None
+            yield self.n_regions
+
+
+# `labels` and `regions` for generators that keep the region # of each cell in a flat sequence
+# `self.lab` (cell = x*size + y; None before a layout exists)
+class FlatLabels:
+
+    # Region # per [x, y] cell, as a (size, size) uint8 grid
+    @property
+    def labels(self):
+        if self.lab is None:
+            return None
+        return np.array(self.lab, dtype=np.uint8).reshape(self.size, self.size)
+
+    # Regions in the same form as `JigsawSudoku.regions` (shapely, built on each access)
+    @property
+    def regions(self):
+        return labels_to_regions(self.labels)
+
+
+class JigsawChain(FlatLabels):
+
+    # Layouts from a Markov chain over partitions rather than region growth. The chain starts from
+    # `start` (any valid label grid; default `start_labels(size)`) and each step picks a cell i of
+    # region A next to region B, and a cell j of B next to A, and swaps them between the regions.
+    # Sizes never change and a swap is only kept if both regions stay connected, so every state is
+    # a valid layout and there are no restarts. `steps` is the mixing length (default 20 per
+    # cell, where the share of cell pairs that changed region since the start levels off): the
+    # number of swaps tried before the first layout, and between layouts from `next_layout`. The
+    # time per layout is proportional to it and hardly varies (9x9 about 15 ms)
+    def __init__(self, size=9, steps=None, start=None, auto_generate=True, rng=None, stats=None):
+        self.size = size
+        self.steps = 20*size*size if steps is None else steps
+        self.stats = GenerationStats() if stats is None else stats
+        self.rng = as_random(rng)
+        self.adjacent = flat_neighbours(size)
+        self.reset(start)
+        if auto_generate is True:
+            self.next_layout()
+
+    # Back to a starting partition (checked to be a valid layout)
+    def reset(self, start=None):
+        labels = start_labels(self.size) if start is None else np.asarray(start, dtype=np.uint8)
+        if labels.shape != (self.size, self.size) or \
+                sorted(np.bincount(labels.ravel(), minlength=self.size + 1)[1:]) != [self.size]*self.size:
+            raise ValueError('start must be a {0}x{0} grid of {0} regions of {0} cells'.format(self.size))
+        self.lab = labels.ravel().tolist()
+        self.members = [set() for _ in range(0, self.size + 1)]
+        for i, k in enumerate(self.lab):
+            self.members[k].add(i)
+        if not all(flat_connected(self.members[k], self.adjacent) for k in range(1, self.size + 1)):
+            raise ValueError('start regions must be connected')
+
+    # Try `steps` boundary swaps; returns how many were made
+    def swap(self, steps):
+        lab, members, adjacent, rng = self.lab, self.members, self.adjacent, self.rng
+        n = self.size*self.size
+        made = 0
+        for _ in range(0, steps):
+            self.stats.cells_tried += 1
+            i = rng.randrange(n)
+            a = lab[i]
+            others = [lab[t] for t in adjacent[i] if lab[t] != a]
+            if len(others) == 0:
+                continue
+            b = rng.choice(others)
+            # cells of B that would still touch A once i has left it
+            into = [j for j in members[b] if any(lab[t] == a and t != i for t in adjacent[j])]
+            if len(into) == 0:
+                self.stats.exclusions += 1
+                continue
+            j = rng.choice(into)
+            # i has to join B other than through j
+            if not any(lab[t] == b and t != j for t in adjacent[i]):
+                self.stats.exclusions += 1
+                continue
+            if trade_cells(members[a], members[b], i, j, adjacent):
+                lab[i], lab[j] = b, a
+                made += 1
+            else:
+                self.stats.exclusions += 1
+        return made
+
+    # Run the chain for `steps` more swaps (default `self.steps`) and return the layout it reaches
+    def next_layout(self, steps=None):
+        with self.stats.phase('swaps'):
+            self.swap(self.steps if steps is None else steps)
+        return self.labels
+
+    # `n` layouts from one chain, `steps` swaps apart
+    def iter_layouts(self, n, steps=None):
+        for _ in range(0, n):
+            yield self.next_layout(steps)
@@ -1,30 +1,11 @@
 # import libraries
-from sympy.utilities.iterables import multiset_permutations
 import numpy as np
-from random import choice
-import time, logging, functools, operator, rasterio.features, shapely.geometry
-from rich.logging import RichHandler
-       
-logger_blocklist=[
-        "matplotlib",
-        "fontTools",
-        "shapely",
-        "PIL",
-        "itertools"]
+import time, logging, functools, operator
+from .stats import GenerationStats
+from .utils import as_random, grid_neighbours
 
-# Set logging format
-FORMAT = "%(message)s"
-logging.basicConfig(
-    level=20, format=FORMAT, datefmt="[%X]", handlers=[RichHandler()]
-)  # set level=20 or logging.INFO to turn off debug. to not set, level = "NOTSET"
-for module in logger_blocklist:
-    logging.getLogger(module).setLevel(logging.WARNING)
-logger = logging.getLogger("rich")
-
-
-# globals
-global PUZZLE_GEN_START_TIME, TIMEOUT
-TIMEOUT = 2
+# Logging is configured by the caller; see the __main__ block below
+logger = logging.getLogger(__name__)
 
 ############################################################################################################################################
 # Helper functions
@@ -77,17 +58,133 @@ def get_adjacent(tri_ind):
                 or (abs(j[1] - i[1]) == 1 and j[0] - i[0] == 0)]})
     return adjacent
 
+# Per-size tables for the corner search, computed once per process: for each corner, its two
+# starting cells and a read-only boolean mask of the triangle it may grow into
+@functools.lru_cache(maxsize=None)
+def corner_tables(size=9):
+    triangles = {
+        (0, 0): ([(1, 0), (0, 1)], gen_ul_indices(size)),
+        (0, size-1): ([(1, size-1), (0, size-2)], gen_ur_indices(size)),
+        (size-1, 0): ([(size-2, 0), (size-1, 1)], gen_ll_indices(size)),
+        (size-1, size-1): ([(size-2, size-1), (size-1, size-2)], gen_lr_indices(size))
+    }
+    tables = dict()
+    for corner, (starts, indices) in triangles.items():
+        mask = np.zeros((size, size), dtype=bool)
+        mask[tuple(np.array(indices).T)] = True
+        mask.flags.writeable = False
+        tables.update({corner: (tuple(starts), mask)})
+    return tables
+
 # Flatten nested lists
 def flatten(nl):
     return functools.reduce(operator.iconcat, nl, [])
 
+# Sizes of the 4-connected components of True cells in a 2D boolean mask. The mask is packed
+# into an integer bitboard with a spare zero column per row (so shifts can't wrap between rows);
+# each flood fill is then a handful of shift/and operations per step
+def component_sizes(mask):
+    mask = np.asarray(mask, dtype=bool)
+    h, w = mask.shape
+    width = w + 1
+    padded = np.zeros((h, width), dtype=bool)
+    padded[:, :w] = mask
+    free = int.from_bytes(np.packbits(padded.ravel(), bitorder='little').tobytes(), 'little')
+    sizes = list()
+    while free:
+        fill = free & -free
+        while True:
+            grown = (fill | (fill << 1) | (fill >> 1) | (fill << width) | (fill >> width)) & free
+            if grown == fill:
+                break
+            fill = grown
+        sizes.append(fill.bit_count())
+        free &= ~fill
+    return sizes
+
+# Random Latin square (values 1..size, each once per row and column) from the Jacobson-Matthews
+# Markov chain: start from the cyclic square and apply random +-1 moves to its incidence cube
+# (cube[row, col, value] = 1 if the square has `value` at (row, col)). Memory is O(size^3) and the
+# result is close to uniform once `iterations` (default size^3) moves have been made
+def random_latin_square(size=9, rng=None, iterations=None):
+    rng = as_random(rng)
+    if iterations is None:
+        iterations = size**3
+    idx = np.arange(size)
+    cube = np.zeros((size, size, size), dtype=np.int8)
+    cube[idx[:, None], idx[None, :], (idx[:, None] + idx[None, :]) % size] = 1
+    improper = None
+    step = 0
+    while step < iterations or improper is not None:
+        step += 1
+        if improper is None:
+            # any empty cell of the cube; its three lines each hold exactly one 1
+            while True:
+                x, y, z = rng.randrange(size), rng.randrange(size), rng.randrange(size)
+                if cube[x, y, z] == 0:
+                    break
+            x1 = int(np.flatnonzero(cube[:, y, z] == 1)[0])
+            y1 = int(np.flatnonzero(cube[x, :, z] == 1)[0])
+            z1 = int(np.flatnonzero(cube[x, y, :] == 1)[0])
+        else:
+            # lines through the -1 cell hold two 1s each; pick one at random
+            x, y, z = improper
+            x1 = int(rng.choice(np.flatnonzero(cube[:, y, z] == 1)))
+            y1 = int(rng.choice(np.flatnonzero(cube[x, :, z] == 1)))
+            z1 = int(rng.choice(np.flatnonzero(cube[x, y, :] == 1)))
+        cube[x, y, z] += 1
+        cube[x, y1, z1] += 1
+        cube[x1, y, z1] += 1
+        cube[x1, y1, z] += 1
+        cube[x, y, z1] -= 1
+        cube[x, y1, z] -= 1
+        cube[x1, y, z] -= 1
+        cube[x1, y1, z1] -= 1
+        improper = (x1, y1, z1) if cube[x1, y1, z1] == -1 else None
+    return cube.argmax(axis=2) + 1
+
+# Dead-end region paths (tuples of indices) for the corner search, kept in a hashed set so a lookup
+# or insert costs O(path length) however many paths are stored. `pinned` paths are never evicted;
+# with `max_size`, the oldest of the other paths are dropped first once the cap is reached
+class PathExclusions:
+
+    def __init__(self, pinned=(), max_size=None):
+        self.pinned = set(tuple(p) for p in pinned)
+        # insertion-ordered, so the first key is the oldest
+        self.paths = dict()
+        self.max_size = max_size
+        self.evicted = 0
+
+    def __contains__(self, path):
+        return path in self.paths or path in self.pinned
+
+    def __len__(self):
+        return len(self.pinned) + len(self.paths)
+
+    def append(self, path):
+        path = tuple(path)
+        if path in self:
+            return
+        self.paths[path] = None
+        if self.max_size is not None and len(self) > self.max_size:
+            del self.paths[next(iter(self.paths))]
+            self.evicted += 1
+
 ############################################################################################################################################
 # SudokuValues Class
 
 class SudokuValues:
 
-    def __init__(self, size=9, set_to_default=False, attempts_per_grid=1e6):
+    # `timeout` is the time in seconds one corner region may spend backtracking before the attempt
+    # is dropped; `rng` is an int seed or a `random.Random` (see `as_random`)
+    def __init__(self, size=9, set_to_default=False, attempts_per_grid=1e6, max_exclusions=None, stats=None,
+            rng=None, timeout=2):
         self.size = size
+        self.max_exclusions = max_exclusions
+        self.rng = as_random(rng)
+        self.timeout = timeout
+        # counters and phase timings (see `GenerationStats`); a new grid counts as a restart
+        self.stats = GenerationStats() if stats is None else stats
         # Generate corner regions
         self.corners = None
         if set_to_default is True:
@@ -104,58 +201,52 @@ class SudokuValues:
                                   [6, 4, 2, 9, 7, 8, 5, 3, 1], 
                                   [9, 7, 8, 5, 3, 1, 6, 4, 2]])
             # init exclusions (edge rows/columns)
-            self.exclude = [
-                tuple((i, 0) for i in range(0, self.size)),
-                tuple((0, i) for i in range(0, self.size)),
-                tuple((i, self.size-1) for i in range(0, self.size)),
-                tuple((0, i) for i in range(self.size-1, -1, -1)),
-                tuple((i, 0) for i in range(self.size-1, -1, -1)),
-                tuple((self.size-1, i) for i in range(0, self.size)),
-                tuple((i, self.size-1) for i in range(self.size-1, -1, -1)),
-                tuple((self.size-1, i) for i in range(self.size-1, -1, -1))
-            ]
+            self.exclude = self.init_exclusions()
             # Generate corners
-            self.corner_loop(attempts_per_grid)
+            with self.stats.phase('corners'):
+                self.corner_loop(attempts_per_grid)
         else:
             corners_complete = False
             while corners_complete is False:
-                # possible rows
-                pr = self.perms()
                 # start out with board that has unique rows/column values
-                for i in range(0, self.size):
-                    if i == 0:
-                        m = pr.pop(0).reshape(1, self.size)
-                    else:
-                        m, pr = self.update_grid(m, pr) 
-                self.grid = m
+                with self.stats.phase('grid'):
+                    self.grid = random_latin_square(self.size, rng=self.rng)
                 logger.info('Grid:\n{}'.format(self.grid))
-                            # init exclusions (edge rows/columns)
-                self.exclude = [
-                    tuple((i, 0) for i in range(0, self.size)),
-                    tuple((0, i) for i in range(0, self.size)),
-                    tuple((i, self.size-1) for i in range(0, self.size)),
-                    tuple((0, i) for i in range(self.size-1, -1, -1)),
-                    tuple((i, 0) for i in range(self.size-1, -1, -1)),
-                    tuple((self.size-1, i) for i in range(0, self.size)),
-                    tuple((i, self.size-1) for i in range(self.size-1, -1, -1)),
-                    tuple((self.size-1, i) for i in range(self.size-1, -1, -1))
-                ]
-                corners_complete = self.corner_loop(attempts_per_grid)
+                # init exclusions (edge rows/columns)
+                self.exclude = self.init_exclusions()
+                with self.stats.phase('corners'):
+                    corners_complete = self.corner_loop(attempts_per_grid)
+                if corners_complete is False:
+                    self.stats.restart(reason='no corners')
 
         
         
+    # Exclusions start out with the edge rows/columns (pinned, so never evicted)
+    def init_exclusions(self):
+        return PathExclusions(pinned=[
+                tuple((i, 0) for i in range(0, self.size)),
+                tuple((0, i) for i in range(0, self.size)),
+                tuple((i, self.size-1) for i in range(0, self.size)),
+                tuple((0, i) for i in range(self.size-1, -1, -1)),
+                tuple((i, 0) for i in range(self.size-1, -1, -1)),
+                tuple((self.size-1, i) for i in range(0, self.size)),
+                tuple((i, self.size-1) for i in range(self.size-1, -1, -1)),
+                tuple((self.size-1, i) for i in range(self.size-1, -1, -1))
+            ], max_size=self.max_exclusions)
+
     # Loop to generate corners until success
     def corner_loop(self, attempts_per_grid):
         attempts = 0
         start_attempts = time.time()
         while True:
             attempts += 1
+            self.stats.attempts += 1
             try:
                 self.corners = self.gen_corner_regions()
                 logger.info('{} Attempts completed in {} seconds. {} exclusions.'\
                     .format(attempts, time.time() - start_attempts, len(self.exclude)))
                 return True
-            except:
+            except Exception:
                 if attempts >= attempts_per_grid:
                     logger.info('{} Attempts completed in {} seconds. {} exclusions.'\
                         .format(attempts, time.time() - start_attempts, len(self.exclude)))
@@ -164,53 +255,26 @@ class SudokuValues:
         
         
                 
-    #----------------------------------------------------------------------------------------------------------------------------------------
-    # Methods to generate basice board with unique rows/columns in `__init__()`
-
-    # convert list to array, reshape to size (1, self.size) to be concatenated to m
-    def reshape_list_to_arr(self, perm):
-        return np.reshape(np.array(perm), (1, self.size))
-
-    # generate all permutations of 1:self.size, reshape each perm; shuffle
-    def perms(self):
-        p = [self.reshape_list_to_arr(perm) for perm in multiset_permutations(np.arange(1, self.size + 1))]
-        np.random.shuffle(p)
-        return p
-
-    # iteratively check if each permutation can be used as a new row; if not, remove; if yes, concatenate; return with reduced permutations
-    def update_grid(self, m, pr):
-        for i in range(0, len(pr)):
-            try:
-                cm = np.concatenate((m, pr[i]), axis=0)
-            except IndexError:
-                logger.error('m: {}\n i: {}\n len(pr): {}\n rmv_idcs: {}'.format(m, i, len(pr), rmv_idcs))
-                raise IndexError
-            if len([col for col in range(0, self.size) if np.unique(cm[:, col]).size == cm.shape[0]]) == self.size:
-                return cm, pr[i + 1:]
-            else:
-                continue
     #----------------------------------------------------------------------------------------------------------------------------------------
     # Methods to divide up regions
 
     # select random corner to be the first region
     def random_corner(self, exclude_corners=list()):
-        return choice([c for c in [(0, 0), (0, self.size-1), (self.size-1, 0), (self.size-1, self.size-1)] \
+        return self.rng.choice([c for c in [(0, 0), (0, self.size-1), (self.size-1, 0), (self.size-1, self.size-1)] \
             if c not in exclude_corners]), exclude_corners
     
-    # test for any blocked regions that are too small
-    def test_for_blocked(self, region_i):
-        x = self.grid
-        # mask region_i
-        for i in region_i:
-            x[i] = -1
-        polygons = [shapely.geometry.Polygon(shape[0]["coordinates"][0]) \
-            for shape in rasterio.features.shapes((x == -1) + 0)]
-        for p in polygons:
-            if p.area % self.size != 0:
-                return True
+    # test for any blocked regions that are too small: True if the cells left over once region_i
+    # and the completed corner regions are taken can't be split into whole regions
+    def test_for_blocked(self, region_i, completed=()):
+        occupied = np.zeros(self.grid.shape, dtype=bool)
+        for i in list(completed) + list(region_i):
+            occupied[i] = True
+        return any(n % self.size != 0 for n in component_sizes(~occupied))
 
     # Recursively generate the corner regions
-    def gen_corner_regions(self, completed_corners=list(), exclude_corners=list()):
+    def gen_corner_regions(self, completed_corners=None, exclude_corners=None):
+        completed_corners = list() if completed_corners is None else completed_corners
+        exclude_corners = list() if exclude_corners is None else exclude_corners
         n_regions = len(completed_corners)
         if n_regions > 0:
             all_completed = flatten(completed_corners)
@@ -222,44 +286,20 @@ class SudokuValues:
             corner, exclude_corners = self.random_corner(exclude_corners=exclude_corners)
         except (TypeError, IndexError):
             raise Exception('There are no possible corners that work given this arrangement')
-        # pick a random direction to start, generate available indices and their adjacent indices
-        if corner == (0, 0):
-            start_1 = (1, 0)
-            start_2 = (0, 1)
-            adj = get_adjacent(gen_ul_indices(self.size))
-            for k in adj.keys():
-                adj[k] = [v for v in adj[k] if v not in all_completed]
-            # column = tuple((i, 0) for i in range(0, self.size))
-            # row = tuple((0, i) for i in range(0, self.size))
-        elif corner == (0, self.size-1):
-            start_1 = (1, self.size-1)
-            start_2 = (0, self.size-2)
-            adj = get_adjacent(gen_ur_indices(self.size))
-            for k in adj.keys():
-                adj[k] = [v for v in adj[k] if v not in all_completed]
-            # column = tuple((i, self.size-1) for i in range(0, self.size))
-            # row = tuple((0, i) for i in range(self.size-1, -1, -1))
-        elif corner == (self.size-1, 0):
-            start_1 = (self.size-2, 0)
-            start_2 = (self.size-1, 1)
-            adj = get_adjacent(gen_ll_indices(self.size))
-            for k in adj.keys():
-                adj[k] = [v for v in adj[k] if v not in all_completed]
-            # column = tuple((i, 0) for i in range(self.size-1, -1, -1))
-            # row = tuple((self.size-1, i) for i in range(0, self.size))
-        else:
-            start_1 = (self.size-2, self.size-1)
-            start_2 = (self.size-1, self.size-2)
-            adj = get_adjacent(gen_lr_indices(self.size))
-            for k in adj.keys():
-                adj[k] = [v for v in adj[k] if v not in all_completed]
-            # column = tuple((i, self.size-1) for i in range(self.size-1, -1, -1))
-            # row = tuple((self.size-1, i) for i in range(self.size-1, -1, -1))
+        # pick a random direction to start; available indices are the corner's triangle less any
+        # completed regions (a mask over the grid), adjacent indices come from the per-size table
+        (start_1, start_2), triangle = corner_tables(self.size)[corner]
+        completed = np.zeros((self.size, self.size), dtype=bool)
+        for i in all_completed:
+            completed[i] = True
+        allowed = triangle & ~completed
+        # keyed by (y, x) here; the neighbour table is the same either way round
+        neighbours = grid_neighbours(self.size)
         # random starting checks
         start_choices = [sc for sc in [start_1, start_2] if sc not in all_completed]
         if len(start_choices) > 1:
-            start = choice(start_choices)
-            start_choices = [choice for choice in start_choices if choice != start]
+            start = self.rng.choice(start_choices)
+            start_choices = [c for c in start_choices if c != start]
         elif len(start_choices) == 1:
             start = start_choices[0]
             start_choices = []
@@ -271,36 +311,42 @@ class SudokuValues:
         region_i = [corner, start]
         region_v = [self.grid[corner], self.grid[start]]
         next = 2
-        PUZZLE_GEN_START_TIME = time.time()
+        start_time = time.time()
         while next < self.size:
             # get adjacent
-            next_ind = [i for i in adj[region_i[next - 1]] if i not in region_i \
+            next_ind = [i for i in neighbours[region_i[next - 1]] if allowed[i] and i not in region_i \
                 and self.grid[i] not in region_v and tuple(region_i + [i]) not in self.exclude]
             if len(next_ind) == 0:
                 if len(region_i) > 2:
-                    if time.time() - PUZZLE_GEN_START_TIME >= TIMEOUT:
+                    if time.time() - start_time >= self.timeout:
                         raise TimeoutError
                     self.exclude.append(tuple(region_i))
+                    self.stats.exclusions += 1
+                    self.stats.backtracks += 1
                     region_i.pop(-1)
                     region_v.pop(-1)
                 elif len(region_i) == 2 and len(start_choices) == 1:
-                    if time.time() - PUZZLE_GEN_START_TIME >= TIMEOUT:
+                    if time.time() - start_time >= self.timeout:
                         raise TimeoutError
                     self.exclude.append(tuple(region_i))
+                    self.stats.exclusions += 1
                     start = start_choices.pop(0)
                     region_i = [corner, start]
                     region_v = [self.grid[corner], self.grid[start]]
                 else:
                     exclude_corners.append(corner)
-                    return self.gen_corner_regions(exclude_corners=exclude_corners)
+                    return self.gen_corner_regions(completed_corners, exclude_corners)
             else:
-                next_ind = choice(next_ind)
+                next_ind = self.rng.choice(next_ind)
+                self.stats.cells_tried += 1
                 region_i.append(next_ind)
                 region_v.append(self.grid[next_ind])
             # make sure none are blocked
             if len(region_i) == self.size:
-                if self.test_for_blocked(region_i):
+                if self.test_for_blocked(region_i, all_completed):
                     self.exclude.append(tuple(region_i))
+                    self.stats.exclusions += 1
+                    self.stats.backtracks += 1
                     region_i.pop(-1)
                     region_v.pop(-1)
             next = len(region_i)
@@ -313,5 +359,7 @@ class SudokuValues:
             return self.gen_corner_regions(completed_corners, exclude_corners) 
 
 if __name__ == '__main__':
+    from rich.logging import RichHandler
+    logging.basicConfig(level=20, format="%(message)s", datefmt="[%X]", handlers=[RichHandler()])
     s = SudokuValues(size=9, set_to_default=False)
     print(s.corners)
\ No newline at end of file
@@ -0,0 +1,176 @@
+# Large-board mode (12x12, 16x16, 25x25, ...): a solved jigsaw (layout + digits) without search.
+#
+# Growing random regions and then filling digits stops scaling around 16x16: a random layout
+# may have no fill at all, and the fill search is heavy-tailed. Instead this starts from a
+# solved box sudoku and morphs the regions with digit-preserving boundary swaps: a cell of
+# region A holding digit d and the cell of a neighbouring region B holding the same d trade
+# regions. Rows and columns are untouched and both regions still hold every digit once, so
+# every step is a valid solved board; a swap is only kept if both regions stay connected.
+# Swapping two digits over a closed group of cells (see `swap_digits`) moves digits around
+# between region swaps so the layout keeps mixing. Everything is held as flat integer lists
+# (cell = x*size + y).
+#
+# Target: a 16x16 layout plus values in under 1 s; with the default 60 steps per cell this is
+# about 0.06 s (25x25 about 0.25 s, 36x36 about 0.5 s), including the extra swaps that break up
+# any plain boxes left over (see `LargeBoard`).
+# Sizes need a box shape (4, 6, 8, 9, 10, 12, 16, 25, ...); prime sizes aren't supported.
+import logging
+import numpy as np
+from .stats import GenerationStats
+from .utils import as_random, flat_neighbours, trade_cells
+from .jigsaw_board import FlatLabels, box_shape, start_labels
+
+logger = logging.getLogger(__name__)
+
+
+# Random solved grid for `start_labels(size)` (indexed like the labels): the pattern solution
+# with digits, lines within bands, lines within stacks, bands and stacks shuffled
+def start_values(size, rng=None):
+    rng = as_random(rng)
+    h, w = box_shape(size)
+
+    def shuffled(n):
+        out = list(range(0, n))
+        rng.shuffle(out)
+        return out
+    xs = [b*h + i for b in shuffled(size // h) for i in shuffled(h)]
+    ys = [b*w + j for b in shuffled(size // w) for j in shuffled(w)]
+    digits = np.array(shuffled(size)) + 1
+    x, y = np.meshgrid(xs, ys, indexing='ij')
+    return digits[(w*(x % h) + x // h + y) % size].astype(np.uint8)
+
+
+class LargeBoard(FlatLabels):
+
+    # `steps` is the number of swaps tried (default 60 per cell). More steps alone don't get rid of
+    # plain boxes: the chain keeps re-forming some (about 0.3 per 9x9 board even at 200 steps per
+    # cell, 1-3 per 25x25), so with `no_boxes` it then runs swaps that start inside the remaining
+    # boxes, half of them digit swaps (which free boxes that no region swap can break), `size` at a
+    # time and up to `steps` more, until no region is a box. Any boxes left after that are logged
+    # as a warning (`box_count` tells how many). The result is `labels` (region #s)
+    # and `grid` (digits), both (size, size) uint8 indexed [x, y]
+    def __init__(self, size=16, steps=None, rng=None, auto_generate=True, stats=None, no_boxes=True):
+        if box_shape(size) is None:
+            raise ValueError('size must have a box shape (not prime), got {}'.format(size))
+        self.size = size
+        self.steps = 60*size*size if steps is None else steps
+        self.rng = as_random(rng)
+        self.stats = GenerationStats() if stats is None else stats
+        # share of steps spent on digit swaps
+        self.digit_rate = 1/size
+        self.no_boxes = no_boxes
+        self.adjacent = flat_neighbours(size)
+        self.reset()
+        if auto_generate is True:
+            with self.stats.phase('swaps'):
+                self.swap(self.steps)
+                if self.no_boxes:
+                    self.break_boxes(self.steps)
+
+    # Swaps from cells of the regions that are plain boxes (and digit swaps), `size` at a time, until none is left or
+    # `steps` have been tried; returns how many boxes are left
+    def break_boxes(self, steps):
+        tried = 0
+        boxes = self.box_regions()
+        while boxes and tried < steps:
+            self.swap(self.size, cells=[i for k in boxes for i in self.members[k]], digit_rate=0.5)
+            tried += self.size
+            boxes = self.box_regions()
+        if boxes:
+            logger.warning('{} plain boxes left in a {}x{} layout after {} extra steps'.format(len(boxes),
+                self.size, self.size, tried))
+        return len(boxes)
+
+    # Back to the starting boxes with freshly shuffled digits
+    def reset(self):
+        with self.stats.phase('start'):
+            self.lab = start_labels(self.size).ravel().tolist()
+            self.val = start_values(self.size, rng=self.rng).ravel().tolist()
+        # cells of each region, and the cell holding each digit in each region
+        self.members = [set() for _ in range(0, self.size + 1)]
+        self.where = [[0]*(self.size + 1) for _ in range(0, self.size + 1)]
+        for i, (k, d) in enumerate(zip(self.lab, self.val)):
+            self.members[k].add(i)
+            self.where[k][d] = i
+
+    @property
+    def grid(self):
+        return np.array(self.val, dtype=np.uint8).reshape(self.size, self.size)
+
+    # Region #s of the regions that are a plain box (`box_shape` cells, either way round)
+    def box_regions(self):
+        size, shape = self.size, sorted(box_shape(self.size))
+        boxes = list()
+        for k in range(1, size + 1):
+            xs, ys = [i // size for i in self.members[k]], [i % size for i in self.members[k]]
+            if sorted((max(xs) - min(xs) + 1, max(ys) - min(ys) + 1)) == shape:
+                boxes.append(k)
+        return boxes
+
+    def box_count(self):
+        return len(self.box_regions())
+
+    # Swap two digits d and e over part of the board. Each row, column and region pairs its d cell
+    # with its e cell; swapping d and e on one connected group of those pairs keeps every unit
+    # valid. Only groups smaller than the whole board change anything. Returns True if it did
+    def swap_digits(self):
+        size, lab, val, where = self.size, self.lab, self.val, self.where
+        d, e = self.rng.sample(range(1, size + 1), 2)
+        cells = [i for i in range(0, size*size) if val[i] == d or val[i] == e]
+        parent = {i: i for i in cells}
+
+        def find(i):
+            while parent[i] != i:
+                parent[i] = parent[parent[i]]
+                i = parent[i]
+            return i
+        # pair the d and e cells of every row, column and region
+        pairs = dict()
+        for i in cells:
+            for unit in (('x', i // size), ('y', i % size), ('r', lab[i])):
+                if unit in pairs:
+                    parent[find(i)] = find(pairs[unit])
+                else:
+                    pairs[unit] = i
+        groups = dict()
+        for i in cells:
+            groups.setdefault(find(i), list()).append(i)
+        if len(groups) == 1:
+            return False
+        for i in self.rng.choice(list(groups.values())):
+            val[i] = e if val[i] == d else d
+            where[lab[i]][val[i]] = i
+        return True
+
+    # Make `steps` random moves (mostly region swaps, a `digit_rate` share of digit swaps), region
+    # swaps starting from a random cell or one of `cells`; returns how many region swaps were made
+    def swap(self, steps, cells=None, digit_rate=None):
+        lab, val, members, where, adjacent = self.lab, self.val, self.members, self.where, self.adjacent
+        rng, n = self.rng, self.size*self.size
+        digit_rate = self.digit_rate if digit_rate is None else digit_rate
+        made = 0
+        for _ in range(0, steps):
+            if rng.random() < digit_rate:
+                self.swap_digits()
+                continue
+            self.stats.cells_tried += 1
+            i = rng.randrange(n) if cells is None else rng.choice(cells)
+            a = lab[i]
+            others = [lab[j] for j in adjacent[i] if lab[j] != a]
+            if len(others) == 0:
+                continue
+            b = rng.choice(others)
+            d = val[i]
+            j = where[b][d]
+            # j has to join A somewhere other than through i (and i join B other than through j)
+            if not any(lab[t] == a and t != i for t in adjacent[j]) or \
+                    not any(lab[t] == b and t != j for t in adjacent[i]):
+                self.stats.exclusions += 1
+                continue
+            if trade_cells(members[a], members[b], i, j, adjacent):
+                lab[i], lab[j] = b, a
+                where[a][d], where[b][d] = j, i
+                made += 1
+            else:
+                self.stats.exclusions += 1
+        return made
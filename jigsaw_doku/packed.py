@@ -0,0 +1,178 @@
+# Packed binary puzzle files: a 16-byte header followed by fixed-width records, so puzzle i sits
+# at a known offset and a memory-mapped reader hands out numpy views without copying.
+#
+# Header (little-endian): magic b'JIGP', version u8, size u8, reserved u16, record width u32,
+# reserved u32. Record (packed, no padding):
+#   size      u8
+#   labels    size*size u8      region # per [x, y] cell
+#   solution  size*size u8      digit per [x, y] cell
+#   givens    ceil(size*size/8) bitmask of given cells, flat [x, y] order, little bit order
+#   n_givens  u16
+#   flags     u16               free for the caller
+#   seed      u64               e.g. the seed the puzzle was generated from
+import os, struct
+import numpy as np
+
+MAGIC = b'JIGP'
+VERSION = 1
+HEADER = struct.Struct('<4sBBHII')
+
+
+# numpy dtype of one record for a size
+def record_dtype(size):
+    return np.dtype([
+        ('size', 'u1'),
+        ('labels', 'u1', (size, size)),
+        ('solution', 'u1', (size, size)),
+        ('givens', 'u1', ((size*size + 7) // 8,)),
+        ('n_givens', '<u2'),
+        ('flags', '<u2'),
+        ('seed', '<u8'),
+    ])
+
+
+# (N, size, size) givens (0 = blank) -> (N, bytes) bitmasks
+def pack_givens(givens):
+    givens = np.asarray(givens)
+    return np.packbits(givens.reshape(len(givens), -1) > 0, axis=1, bitorder='little')
+
+
+# (N, bytes) bitmasks -> (N, size, size) bool masks
+def unpack_givens(bits, size):
+    bits = np.asarray(bits)
+    return np.unpackbits(bits, axis=-1, count=size*size, bitorder='little').astype(bool) \
+        .reshape(bits.shape[:-1] + (size, size))
+
+
+def read_header(f):
+    magic, version, size, _, width, _ = HEADER.unpack(f.read(HEADER.size))
+    if magic != MAGIC:
+        raise ValueError('not a packed puzzle file')
+    if version != VERSION or width != record_dtype(size).itemsize:
+        raise ValueError('unsupported packed puzzle file (version {}, size {})'.format(version, size))
+    return size
+
+
+# Appends records to a packed file, creating it (with its header) if needed. `path` may also be
+# an open binary stream (e.g. `sys.stdout.buffer`), which gets a fresh header and is left open
+class PackedWriter:
+
+    def __init__(self, path, size=9):
+        self.size = size
+        self.dtype = record_dtype(size)
+        self.owned = not hasattr(path, 'write')
+        if not self.owned:
+            self.f = path
+            self.f.write(self.header())
+        elif os.path.exists(path) and os.path.getsize(path) > 0:
+            with open(path, 'rb') as f:
+                if read_header(f) != size:
+                    raise ValueError('{} holds a different board size'.format(path))
+            # drop a torn final record
+            body = os.path.getsize(path) - HEADER.size
+            os.truncate(path, HEADER.size + body - body % self.dtype.itemsize)
+            self.f = open(path, 'ab')
+        else:
+            self.f = open(path, 'wb')
+            self.f.write(self.header())
+
+    def header(self):
+        return HEADER.pack(MAGIC, VERSION, self.size, 0, self.dtype.itemsize, 0)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        if self.owned:
+            self.f.close()
+        else:
+            self.f.flush()
+
+    # Write a batch: (N, size, size) labels and solutions, optional (N, size, size) givens
+    # (0 = blank; default all given), and optional per-record seeds and flags
+    def write_many(self, labels, solutions, givens=None, seeds=None, flags=None):
+        labels = np.asarray(labels, dtype=np.uint8)
+        n = len(labels)
+        records = np.zeros(n, dtype=self.dtype)
+        records['size'] = self.size
+        records['labels'] = labels
+        records['solution'] = solutions
+        givens = np.asarray(solutions) if givens is None else np.asarray(givens)
+        records['givens'] = pack_givens(givens)
+        records['n_givens'] = (givens.reshape(n, -1) > 0).sum(axis=1)
+        if seeds is not None:
+            records['seed'] = seeds
+        if flags is not None:
+            records['flags'] = flags
+        self.f.write(records.tobytes())
+        return n
+
+    def write(self, labels, solution, givens=None, seed=0, flags=0):
+        return self.write_many(np.asarray(labels)[None], np.asarray(solution)[None],
+            None if givens is None else np.asarray(givens)[None], seeds=[seed], flags=[flags])
+
+    def flush(self):
+        self.f.flush()
+
+
+# Memory-mapped, read-only view of a packed file. `records` is the structured array; `labels`,
+# `solutions`, `givens_bits` and `seeds` are (N, ...) views of its fields. Nothing is copied
+# until a caller does so (`puzzle(i)` builds a fresh grid)
+class PackedReader:
+
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            self.size = read_header(f)
+        self.dtype = record_dtype(self.size)
+        n = (os.path.getsize(path) - HEADER.size) // self.dtype.itemsize
+        if n > 0:
+            self.records = np.memmap(path, dtype=self.dtype, mode='r', offset=HEADER.size, shape=(n,))
+        else:
+            self.records = np.zeros(0, dtype=self.dtype)
+
+    def __len__(self):
+        return len(self.records)
+
+    @property
+    def labels(self):
+        return self.records['labels']
+
+    @property
+    def solutions(self):
+        return self.records['solution']
+
+    @property
+    def givens_bits(self):
+        return self.records['givens']
+
+    @property
+    def seeds(self):
+        return self.records['seed']
+
+    # (labels, solution) views for puzzle i
+    def __getitem__(self, i):
+        record = self.records[i]
+        return record['labels'], record['solution']
+
+    # Givens of puzzle i as a bool mask
+    def givens_mask(self, i):
+        return unpack_givens(self.records['givens'][i], self.size)
+
+    # Puzzle i as a digit grid with 0 for blanks
+    def puzzle(self, i):
+        return np.where(self.givens_mask(i), self.records['solution'][i], 0).astype(np.uint8)
+
+    def close(self):
+        mm = getattr(self.records, '_mmap', None)
+        self.records = np.zeros(0, dtype=self.dtype)
+        if mm is not None:
+            mm.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
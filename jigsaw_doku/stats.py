@@ -0,0 +1,63 @@
+# Structured generation statistics shared by the layout and value generators
+import time
+from contextlib import contextmanager
+
+COUNTERS = ('restarts', 'backtracks', 'exclusions', 'cells_tried', 'attempts')
+
+
+# Counters and per-phase timings for one generator instance.
+#   restarts    - generation thrown away and started over (timeouts, new value grids)
+#   backtracks  - regions (layouts) or cells (corner paths) rolled back
+#   exclusions  - cells or paths ruled out
+#   cells_tried - candidate cells checked
+#   attempts    - corner search attempts (values)
+# `phases` maps a phase name to total seconds and `calls` to how often it ran. Callbacks are
+# called as `callback(event, stats, **info)` on coarse events only: 'restart', 'backtrack' (a
+# layout region rollback) and 'phase' when a phase ends. Per-cell counts (including corner path
+# backtracks) are plain increments, so hot loops don't pay for the callbacks
+class GenerationStats:
+
+    def __init__(self, callbacks=()):
+        for name in COUNTERS:
+            setattr(self, name, 0)
+        self.phases = dict()
+        self.calls = dict()
+        self.callbacks = list(callbacks)
+
+    def __repr__(self):
+        return 'GenerationStats({})'.format(', '.join('{}={}'.format(k, v) for k, v in self.as_dict().items()))
+
+    # Register a callback; returns it so this can be used as a decorator
+    def subscribe(self, callback):
+        self.callbacks.append(callback)
+        return callback
+
+    def emit(self, event, **info):
+        for callback in self.callbacks:
+            callback(event, self, **info)
+
+    def restart(self, **info):
+        self.restarts += 1
+        self.emit('restart', **info)
+
+    def backtrack(self, n=1, **info):
+        self.backtracks += n
+        self.emit('backtrack', n=n, **info)
+
+    # Time a block under `name`; nested and repeated phases accumulate
+    @contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        try:
+            yield self
+        finally:
+            elapsed = time.perf_counter() - start
+            self.phases[name] = self.phases.get(name, 0.0) + elapsed
+            self.calls[name] = self.calls.get(name, 0) + 1
+            self.emit('phase', name=name, seconds=elapsed)
+
+    # Plain dict (JSON-serialisable) for exporting to monitoring
+    def as_dict(self):
+        out = {name: getattr(self, name) for name in COUNTERS}
+        out.update(phases=dict(self.phases), calls=dict(self.calls))
+        return out
@@ -0,0 +1,199 @@
+# On-disk library of unique layouts, deduplicated up to rotation, reflection and region numbering.
+#
+# A layout is canonicalised by taking all 8 dihedral transforms of its label grid, renumbering
+# the regions of each in order of first appearance (flat [x, y] order), and keeping the smallest
+# as bytes. Two layouts are the same library entry exactly when their canonical forms match.
+#
+# A store is a directory holding
+#   meta.json    - size and format version
+#   layouts.bin  - canonical label grids, size*size bytes each, appended in order
+#   keys.bin     - a little-endian uint64 hash of each record, appended in the same order
+# Both files are append-only; a torn final write is trimmed when the store is next opened.
+# Lookups go through a sorted array of keys (plus a dict of recent appends, merged in now and
+# then), so they cost O(log n) in numpy rather than a Python object per entry.
+import hashlib, json, os, random
+import numpy as np
+from .jigsaw_board import regions_to_labels
+
+FORMAT_VERSION = 1
+
+
+# The 8 dihedral transforms of a (..., size, size) array (last two axes), stacked on a new
+# axis just before them: identity, 3 rotations, then the transpose and its 3 rotations
+def dihedral(a):
+    a = np.asarray(a)
+    t = np.swapaxes(a, -1, -2)
+    return np.stack([np.rot90(b, k, axes=(-2, -1)) for b in (a, t) for k in range(0, 4)], axis=-3)
+
+
+# Renumber the regions of each grid in a (..., size, size) stack as 1, 2, ... in order of first
+# appearance (flat order), so grids that only differ in region numbering become equal
+def relabel(stack):
+    stack = np.asarray(stack)
+    shape = stack.shape
+    flat = stack.reshape(-1, shape[-1]*shape[-2]).astype(np.int64)
+    rows, n = flat.shape
+    size = int(flat.max()) + 1 if flat.size else 1
+    first = np.full((rows, size), n, dtype=np.int64)
+    np.minimum.at(first, (np.repeat(np.arange(rows), n), flat.ravel()), np.tile(np.arange(n), rows))
+    # rank of each label's first appearance within its row (labels never seen sort last)
+    rank = np.argsort(np.argsort(first, axis=1, kind='stable'), axis=1, kind='stable')
+    out = np.take_along_axis(rank, flat, axis=1) + 1
+    return out.reshape(shape).astype(np.uint8)
+
+
+# Canonical form of each layout in a (N, size, size) stack of label grids
+def canonical_many(stack):
+    stack = np.asarray(stack)
+    forms = relabel(dihedral(stack))
+    n = stack.shape[0]
+    out = np.empty_like(stack, dtype=np.uint8)
+    for i in range(0, n):
+        keys = [f.tobytes() for f in forms[i]]
+        out[i] = forms[i][keys.index(min(keys))]
+    return out
+
+
+# Canonical form of one layout: a (size, size) label grid or a `JigsawSudoku.regions` dict
+def canonical(layout, size=None):
+    return canonical_many(as_labels(layout, size)[None])[0]
+
+
+# Label grid for a layout given as a grid or as a `regions` dict of `Region`s
+def as_labels(layout, size=None):
+    if isinstance(layout, dict):
+        size = len(layout) if size is None else size
+        return regions_to_labels(layout, size)
+    return np.asarray(layout, dtype=np.uint8)
+
+
+# 64-bit hash of a canonical form
+def layout_key(form):
+    return int.from_bytes(hashlib.blake2b(np.ascontiguousarray(form).tobytes(), digest_size=8).digest(), 'little')
+
+
+class LayoutStore:
+
+    # Open (or create) the store in directory `path` for `size` x `size` layouts
+    def __init__(self, path, size=9, merge_every=65536):
+        self.path = path
+        self.size = size
+        self.record = size*size
+        self.merge_every = merge_every
+        os.makedirs(path, exist_ok=True)
+        meta_path = os.path.join(path, 'meta.json')
+        if os.path.exists(meta_path):
+            with open(meta_path) as f:
+                meta = json.load(f)
+            if meta.get('size') != size or meta.get('version') != FORMAT_VERSION:
+                raise ValueError('{} holds size {} layouts (format {}), not size {}'.format(path,
+                    meta.get('size'), meta.get('version'), size))
+        else:
+            with open(meta_path, 'w') as f:
+                json.dump(dict(size=size, version=FORMAT_VERSION), f)
+        data_path = os.path.join(path, 'layouts.bin')
+        keys_path = os.path.join(path, 'keys.bin')
+        for p in (data_path, keys_path):
+            if not os.path.exists(p):
+                open(p, 'wb').close()
+        keys = np.fromfile(keys_path, dtype='<u8')
+        self.n = min(len(keys), os.path.getsize(data_path) // self.record)
+        # drop a torn final append
+        for p, width in ((data_path, self.record), (keys_path, 8)):
+            if os.path.getsize(p) != self.n*width:
+                os.truncate(p, self.n*width)
+        keys = keys[:self.n]
+        order = np.argsort(keys, kind='stable')
+        self._keys = keys[order]
+        self._pos = order.astype(np.int64)
+        self._recent = dict()
+        self._data = open(data_path, 'ab')
+        self._keys_file = open(keys_path, 'ab')
+        self._reader = open(data_path, 'rb')
+
+    def __len__(self):
+        return self.n
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        for f in (self._data, self._keys_file, self._reader):
+            f.close()
+
+    # Stored record i as a (size, size) uint8 label grid
+    def get(self, i):
+        if not 0 <= i < self.n:
+            raise IndexError(i)
+        self._reader.seek(i*self.record)
+        return np.frombuffer(self._reader.read(self.record), dtype=np.uint8).reshape(self.size, self.size)
+
+    # Uniform random stored layout (canonical form) in O(1)
+    def sample(self, rng=None):
+        rng = random if rng is None else rng
+        if self.n == 0:
+            raise IndexError('sample from an empty store')
+        return self.get(rng.randrange(self.n))
+
+    # Index of a canonical form in the store, or None
+    def find(self, form, key=None):
+        key = layout_key(form) if key is None else key
+        candidates = list(self._recent.get(key, ()))
+        lo = np.searchsorted(self._keys, np.uint64(key), side='left')
+        hi = np.searchsorted(self._keys, np.uint64(key), side='right')
+        candidates += self._pos[lo:hi].tolist()
+        data = form.tobytes()
+        for i in candidates:
+            if self.get(i).tobytes() == data:
+                return i
+        return None
+
+    def __contains__(self, layout):
+        return self.find(canonical(layout, self.size)) is not None
+
+    # Add a layout (label grid or `regions` dict); returns (index, added) where added is False if
+    # an equivalent layout was already stored
+    def add(self, layout):
+        return self.add_form(canonical(layout, self.size))
+
+    # Add many label grids at once; returns the number that were new
+    def add_many(self, stack):
+        added = 0
+        for form in canonical_many(np.asarray(stack, dtype=np.uint8)):
+            added += self.add_form(form)[1]
+        return added
+
+    def add_form(self, form):
+        form = np.ascontiguousarray(form, dtype=np.uint8)
+        if form.shape != (self.size, self.size):
+            raise ValueError('expected a {0}x{0} layout, got {1}'.format(self.size, form.shape))
+        key = layout_key(form)
+        found = self.find(form, key)
+        if found is not None:
+            return found, False
+        i = self.n
+        # the record goes down before its key, so a torn write never leaves a key without data
+        self._data.write(form.tobytes())
+        self._data.flush()
+        self._keys_file.write(key.to_bytes(8, 'little'))
+        self._keys_file.flush()
+        self.n += 1
+        self._recent.setdefault(key, list()).append(i)
+        if len(self._recent) >= self.merge_every:
+            self.merge()
+        return i, True
+
+    # Fold recent appends into the sorted key index
+    def merge(self):
+        if len(self._recent) == 0:
+            return
+        keys = np.fromiter((k for k, v in self._recent.items() for _ in v), dtype=np.uint64)
+        pos = np.fromiter((i for v in self._recent.values() for i in v), dtype=np.int64)
+        keys = np.concatenate([self._keys, keys])
+        pos = np.concatenate([self._pos, pos])
+        order = np.argsort(keys, kind='stable')
+        self._keys, self._pos = keys[order], pos[order]
+        self._recent = dict()
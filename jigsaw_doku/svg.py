@@ -0,0 +1,186 @@
+# SVG rendering of layouts and puzzles: one board per file, or many boards per print sheet.
+#
+# Boards are drawn in board units (one unit per cell) inside a scaled group, with x to the right
+# and y up, as in the shapely geometry (`Cell.x_start`, `Cell.y_start`). Everything that only
+# depends on the board size and style - the thin cell lines, the frame, the path piece for every
+# possible region border, the <text> element for every digit in every cell - is built once and
+# cached, so a board costs a few numpy lookups plus one `''.join`. The cell grid is defined once
+# per file and reused through <use>, which keeps sheets of hundreds of boards small.
+import functools
+import numpy as np
+
+# px per cell, stroke widths in px, digit height as a share of the cell
+STYLE = dict(cell=40, thin=1, thick=3, font=0.6, ink='#000', lines='#888')
+
+
+# Per-size pieces, all in board units
+class BoardTemplate:
+
+    def __init__(self, size):
+        self.size = size
+        # vertical border between (x, y) and (x + 1, y), horizontal border between (x, y) and (x, y + 1)
+        self.v_edges = np.array([['M{} {}v1'.format(x + 1, size - 1 - y) for y in range(0, size)] \
+            for x in range(0, size - 1)], dtype=object)
+        self.h_edges = np.array([['M{} {}h1'.format(x, size - 1 - y) for y in range(0, size - 1)] \
+            for x in range(0, size)], dtype=object)
+        # text[x, y, d]: digit d centred in cell (x, y)
+        self.text = np.empty((size, size, size + 1), dtype=object)
+        for x in range(0, size):
+            for y in range(0, size):
+                for d in range(0, size + 1):
+                    self.text[x, y, d] = '<text x="{}" y="{}">{}</text>'.format(x + .5, size - y - .5, d)
+        lines = ''.join('M0 {0}H{1}M{0} 0V{1}'.format(i, size) for i in range(1, size))
+        self.defs = '<g id="grid{0}"><path class="g" d="{1}"/><rect class="r" width="{0}" height="{0}"/></g>' \
+            .format(size, lines)
+        self.use = '<use xlink:href="#grid{}"/>'.format(size)
+
+
+@functools.lru_cache(maxsize=None)
+def board_template(size):
+    return BoardTemplate(size)
+
+
+# Opening tag, styles and grid definitions for a file of `width` x `height` px holding boards of
+# the given sizes
+@functools.lru_cache(maxsize=256)
+def svg_header(width, height, sizes, cell, thin, thick, font, ink, lines):
+    return ''.join([
+        '<svg xmlns="http://www.w3.org/2000/svg" xmlns:xlink="http://www.w3.org/1999/xlink" version="1.1" ',
+        'width="{0:g}" height="{1:g}" viewBox="0 0 {0:g} {1:g}">'.format(width, height),
+        '<style>path,rect{fill:none;stroke-linecap:square}',
+        '.g{{stroke:{};stroke-width:{:g}}}'.format(lines, thin/cell),
+        '.r{{stroke:{};stroke-width:{:g}}}'.format(ink, thick/cell),
+        'text{{font:{:g}px sans-serif;fill:{};text-anchor:middle;dominant-baseline:central}}</style>'.format(font, ink),
+        '<defs>', ''.join(board_template(s).defs for s in sizes), '</defs>'])
+
+
+# Region borders of a label grid (region # per [x, y] cell) as a path `d` string
+def border_path(labels):
+    labels = np.asarray(labels)
+    tpl = board_template(labels.shape[0])
+    parts = tpl.v_edges[labels[:-1, :] != labels[1:, :]].tolist()
+    parts += tpl.h_edges[labels[:, :-1] != labels[:, 1:]].tolist()
+    return ''.join(parts)
+
+
+# Region outlines as a path `d` string, from `JigsawSudoku.regions` (each `Region.region_exterior`
+# is a closed ring of (x, y) corners) or from any iterable of such rings
+def exterior_path(regions, size):
+    rings = [r.region_exterior for r in regions.values()] if isinstance(regions, dict) else regions
+    parts = list()
+    for ring in rings:
+        parts.append('M{:g} {:g}'.format(ring[0][0], size - ring[0][1]))
+        parts.extend('L{:g} {:g}'.format(x, size - y) for x, y in ring[1:])
+    return ''.join(parts)
+
+
+# Region borders as a path `d` string for each board of a (N, size, size) stack, computed for the
+# whole stack at once
+def border_paths(stack):
+    stack = np.asarray(stack)
+    n, size = stack.shape[0], stack.shape[1]
+    tpl = board_template(size)
+    v = (stack[:, :-1, :] != stack[:, 1:, :]).reshape(n, -1)
+    h = (stack[:, :, :-1] != stack[:, :, 1:]).reshape(n, -1)
+    v_parts = tpl.v_edges.ravel()[np.nonzero(v)[1]].tolist()
+    h_parts = tpl.h_edges.ravel()[np.nonzero(h)[1]].tolist()
+    v_ends, h_ends = np.cumsum(v.sum(axis=1)).tolist(), np.cumsum(h.sum(axis=1)).tolist()
+    out, va, ha = list(), 0, 0
+    for vb, hb in zip(v_ends, h_ends):
+        out.append(''.join(v_parts[va:vb]) + ''.join(h_parts[ha:hb]))
+        va, ha = vb, hb
+    return out
+
+
+# Digit <text> elements for each board of a (N, size, size) stack (0 = blank)
+def digit_texts(stack):
+    stack = np.asarray(stack)
+    n, size = stack.shape[0], stack.shape[1]
+    b, x, y = np.nonzero(stack)
+    parts = board_template(size).text[x, y, stack[b, x, y]].tolist()
+    ends = np.cumsum(np.bincount(b, minlength=n)).tolist()
+    out, a = list(), 0
+    for e in ends:
+        out.append(''.join(parts[a:e]))
+        a = e
+    return out
+
+
+# Inner markup of one board (grid, borders, digits) in board units
+def board_body(size, path, texts=''):
+    tpl = board_template(size)
+    return ''.join([tpl.use, '<path class="r" d="', path, '"/>', texts])
+
+
+# One board as a standalone SVG string. `layout` is a (size, size) label grid, a regions dict, or
+# with `size` given, an iterable of exterior rings (see `exterior_path`); `digits` is indexed like
+# the labels, 0 for blanks. `margin` is in cells
+def render_board(layout, digits=None, size=None, margin=0.5, **style):
+    style = dict(STYLE, **style)
+    if isinstance(layout, dict) or size is not None:
+        size = len(layout) if size is None else size
+        path = exterior_path(layout, size)
+    else:
+        layout = np.asarray(layout)
+        size = layout.shape[0]
+        path = border_path(layout)
+    texts = '' if digits is None else digit_texts(np.asarray(digits)[None])[0]
+    cell = style['cell']
+    extent = (size + 2*margin)*cell
+    return ''.join([
+        svg_header(extent, extent, (size,), **style),
+        '<g transform="scale({:g}) translate({:g} {:g})">'.format(cell, margin, margin),
+        board_body(size, path, texts), '</g></svg>\n'])
+
+
+# One print sheet holding a (N, size, size) stack of layouts (and optional digit stack) in a grid
+# of `cols` columns, as a standalone SVG string. `gap` is the space around each board, in cells
+def render_sheet(layouts, digits=None, cols=10, gap=1, **style):
+    style = dict(STYLE, **style)
+    layouts = np.asarray(layouts)
+    n, size = layouts.shape[0], layouts.shape[1]
+    rows = -(-n // cols)
+    cell, pitch = style['cell'], size + gap
+    paths = border_paths(layouts)
+    texts = ['']*n if digits is None else digit_texts(digits)
+    parts = [svg_header((cols*pitch + gap)*cell, (rows*pitch + gap)*cell, (size,), **style),
+        '<g transform="scale({:g})">'.format(cell)]
+    for i in range(0, n):
+        parts.append('<g transform="translate({} {})">'.format(gap + (i % cols)*pitch, gap + (i // cols)*pitch))
+        parts.append(board_body(size, paths[i], texts[i]))
+        parts.append('</g>')
+    parts.append('</g></svg>\n')
+    return ''.join(parts)
+
+
+# Sheets of `cols` x `rows` boards from stacks of layouts and digits (e.g. `PackedReader.labels`
+# and `.solutions`, or `iter_puzzles` output stacked), one SVG string per sheet
+def iter_sheets(layouts, digits=None, cols=10, rows=10, gap=1, **style):
+    per_sheet = cols*rows
+    for start in range(0, len(layouts), per_sheet):
+        chunk = None if digits is None else np.asarray(digits[start:start + per_sheet])
+        yield render_sheet(np.asarray(layouts[start:start + per_sheet]), chunk, cols=cols, gap=gap, **style)
+
+
+# Write sheets to files named by `pattern` (formatted with the sheet number); returns how many
+def write_sheets(layouts, digits=None, pattern='sheet-{:05d}.svg', cols=10, rows=10, gap=1, **style):
+    count = 0
+    for i, sheet in enumerate(iter_sheets(layouts, digits, cols=cols, rows=rows, gap=gap, **style)):
+        with open(pattern.format(i), 'w') as f:
+            f.write(sheet)
+        count += 1
+    return count
+
+
+# Plain background of thin lines every `step` px, with every line whose position is a multiple
+# of `every` drawn thicker (the sheet background that `gen_svg.py` writes)
+def background_grid(width=1400, height=800, step=10, every=3):
+    parts = ['<svg xmlns="http://www.w3.org/2000/svg" version="1.1" xmlns:xlink="http://www.w3.org/1999/xlink"'
+        '    xmlns:svgjs="http://svgjs.dev/svgjs" viewBox="0 0 {0} {1}" width="{0}" height="{1}">\n'
+        '    \t<g stroke-width="1" stroke="hsl(32, 1%, 1%)" fill="none" stroke-linecap="round">'.format(width, height)]
+    for x in range(0, height, step):
+        parts.append('        <path d="M 0 {} H {} "{}></path>\n'.format(x, width, ' stroke-width="2"' if x % every == 0 else ''))
+    for y in range(0, width, step):
+        parts.append('        <path d="M {} 0 V {} "{}></path>\n'.format(y, height, ' stroke-width="2"' if y % every == 0 else ''))
+    parts.append('\t</g>\n</svg>')
+    return ''.join(parts)
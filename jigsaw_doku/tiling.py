@@ -0,0 +1,297 @@
+# Layouts as random tilings of the board by polyominoes of `size` cells (exact cover).
+#
+# Every fixed polyomino of `size` cells (Redelmeier's enumeration: 9,910 for size 9, which are
+# the 1,285 free nonominoes in all their rotations and reflections) is placed at every offset on
+# the board. Each placement is a bitmask over the cells (flat [x, y] order, cell = x*size + y)
+# held as little-endian uint64 words. The catalog only depends on the size, so it is built once
+# and cached on disk (see `cache_dir`) together with the per-cell lookup tables, then shared
+# in memory; constraints are a mask over that one copy.
+#
+# A tiling picks placements that cover every cell exactly once. The search always fills the
+# free cell with the fewest free neighbours (ties broken by a random cell order), tries the
+# placements through it in random order, and drops any that would leave a piece of free space
+# that isn't a multiple of `size`. Constraints act on the catalog before the search: cell
+# groups that must share a region (`together`), or no regions that are plain boxes (`no_boxes`).
+#
+# The catalog grows quickly with the size (about 300k placements for 9x9, 1.3M for 10x10), so
+# sizes above MAX_SIZE are refused; `JigsawChain` and `large.LargeBoard` cover bigger boards.
+import functools, logging, os
+import numpy as np
+from .jigsaw_board import FlatLabels, box_shape
+from .jigsaw_values import component_sizes
+from .stats import GenerationStats
+from .utils import as_random
+
+logger = logging.getLogger(__name__)
+
+MAX_SIZE = 10
+CATALOG_VERSION = 2
+
+
+# Directory for cached catalogs: $JIGSAW_DOKU_CACHE, else ~/.cache/jigsaw_doku
+def cache_dir():
+    return os.environ.get('JIGSAW_DOKU_CACHE') or os.path.join(os.path.expanduser('~'), '.cache', 'jigsaw_doku')
+
+
+# All fixed polyominoes of n cells as tuples of (x, y) cells, shifted so min x = min y = 0
+def fixed_polyominoes(n):
+    out = list()
+
+    # a cell may join if it comes after the origin in (y, x) order
+    def valid(c):
+        return c[1] > 0 or (c[1] == 0 and c[0] >= 0)
+
+    def grow(poly, untried, seen):
+        untried = list(untried)
+        while untried:
+            c = untried.pop()
+            poly.append(c)
+            if len(poly) == n:
+                out.append(tuple(poly))
+            else:
+                x, y = c
+                new = [a for a in ((x-1, y), (x+1, y), (x, y-1), (x, y+1)) if valid(a) and a not in seen]
+                grow(poly, untried + new, seen | set(new))
+            poly.pop()
+    grow(list(), [(0, 0)], {(0, 0)})
+    shifted = list()
+    for poly in out:
+        mx, my = min(x for x, _ in poly), min(y for _, y in poly)
+        shifted.append(tuple(sorted((x - mx, y - my) for x, y in poly)))
+    return shifted
+
+
+# Number of free polyominoes of n cells (fixed ones up to rotation and reflection)
+def count_free(n):
+    forms = set()
+    for poly in fixed_polyominoes(n):
+        variants = list()
+        for t in range(0, 8):
+            cells = [(y, x) if t & 4 else (x, y) for x, y in poly]
+            cells = [(-x if t & 1 else x, -y if t & 2 else y) for x, y in cells]
+            mx, my = min(x for x, _ in cells), min(y for _, y in cells)
+            variants.append(tuple(sorted((x - mx, y - my) for x, y in cells)))
+        forms.add(min(variants))
+    return len(forms)
+
+
+# Flat cell indices of every placement of every fixed polyomino on the board, (P, size) int64
+def placement_cells(size):
+    chunks = list()
+    for poly in fixed_polyominoes(size):
+        xs = np.array([x for x, _ in poly])
+        ys = np.array([y for _, y in poly])
+        ox, oy = np.meshgrid(np.arange(0, size - xs.max()), np.arange(0, size - ys.max()), indexing='ij')
+        ox, oy = ox.reshape(-1, 1), oy.reshape(-1, 1)
+        chunks.append(np.sort((xs + ox)*size + ys + oy, axis=1))
+    return np.concatenate(chunks)
+
+
+# (P, words) uint64 bitmasks from (P, size) flat cell indices
+def cells_to_words(cells, n_cells):
+    words = np.zeros((len(cells), (n_cells + 63) // 64), dtype=np.uint64)
+    for j in range(0, cells.shape[1]):
+        w, b = cells[:, j] // 64, (cells[:, j] % 64).astype(np.uint64)
+        for k in range(0, words.shape[1]):
+            hit = w == k
+            words[hit, k] |= np.left_shift(np.uint64(1), b[hit])
+    return words
+
+
+# (P, size) flat cell indices from (P, words) uint64 bitmasks
+def words_to_cells(words, size):
+    bits = np.unpackbits(words.astype('<u8').view(np.uint8), axis=1, bitorder='little')[:, :size*size]
+    return np.nonzero(bits)[1].reshape(len(words), size)
+
+
+# Placements through each cell: placement ids grouped by cell (`order`), with cell c's group at
+# order[starts[c]:starts[c + 1]]
+def through_tables(cells, n_cells):
+    order = (np.argsort(cells.ravel(), kind='stable') // cells.shape[1]).astype(np.int32)
+    starts = np.zeros(n_cells + 1, dtype=np.int64)
+    starts[1:] = np.cumsum(np.bincount(cells.ravel(), minlength=n_cells))
+    return order, starts
+
+
+# Every placement for one size, with its bitmask words, cells and per-cell lookup. Read-only and
+# shared by every search in the process
+class Catalog:
+
+    def __init__(self, size, words, cells, order, starts):
+        self.size = size
+        self.words = words
+        self.cells = cells
+        self.order = order
+        self.starts = starts
+
+    def __len__(self):
+        return len(self.cells)
+
+    # ids of the placements covering `cell`
+    def through(self, cell):
+        return self.order[self.starts[cell]:self.starts[cell + 1]]
+
+    # bitmask of placement p as a python int
+    def mask(self, p):
+        return int.from_bytes(self.words[p].tobytes(), 'little')
+
+
+# The catalog for a size: from the disk cache when there (written on first use), then kept in
+# memory. The cache holds the derived tables too, so loading it is a plain read
+@functools.lru_cache(maxsize=None)
+def load_catalog(size, directory=None):
+    if not 2 <= size <= MAX_SIZE:
+        raise ValueError('tiling catalogs are built for sizes 2..{}, not {}'.format(MAX_SIZE, size))
+    directory = cache_dir() if directory is None else directory
+    path = os.path.join(directory, 'placements-{}-v{}.npz'.format(size, CATALOG_VERSION))
+    if os.path.exists(path):
+        try:
+            with np.load(path) as f:
+                return Catalog(size, f['words'].astype(np.uint64), f['cells'], f['order'], f['starts'])
+        except (OSError, ValueError, KeyError):
+            logger.warning('rebuilding unreadable catalog {}'.format(path))
+    cells = placement_cells(size).astype(np.uint16)
+    words = cells_to_words(cells.astype(np.int64), size*size)
+    order, starts = through_tables(cells, size*size)
+    try:
+        os.makedirs(directory, exist_ok=True)
+        tmp = '{}.{}.tmp'.format(path, os.getpid())
+        with open(tmp, 'wb') as f:
+            np.savez(f, words=words.astype('<u8'), cells=cells, order=order, starts=starts)
+        os.replace(tmp, path)
+    except OSError as e:
+        logger.warning('could not cache catalog in {}: {}'.format(directory, e))
+    return Catalog(size, words, cells, order, starts)
+
+
+# The placements of a shared catalog that meet some constraints, as an index array (and mask)
+# over it: `together` is a list of cell groups ((x, y) lists) that must each lie in a single
+# region, `no_boxes` drops placements that are exactly a box of `box_shape(size)`
+class Placements:
+
+    def __init__(self, catalog, together=(), no_boxes=False):
+        self.catalog = catalog
+        size, cells = catalog.size, catalog.cells
+        allowed = np.ones(len(cells), dtype=bool)
+        for group in together:
+            flat = [x*size + y for x, y in group]
+            inside = np.isin(cells, flat).sum(axis=1)
+            allowed &= (inside == 0) | (inside == len(set(flat)))
+        shape = box_shape(size)
+        if no_boxes and shape is not None:
+            # `size` cells spanning h x w are exactly an h x w box
+            xs, ys = cells // size, cells % size
+            span = (xs.max(axis=1) - xs.min(axis=1) + 1, ys.max(axis=1) - ys.min(axis=1) + 1)
+            for h, w in {shape, shape[::-1]}:
+                allowed &= ~((span[0] == h) & (span[1] == w))
+        self.allowed = allowed
+        self.index = np.flatnonzero(allowed).astype(np.int32)
+
+    def __len__(self):
+        return len(self.index)
+
+    # ids (in the shared catalog) of the allowed placements covering `cell`
+    def through(self, cell):
+        ids = self.catalog.through(cell)
+        return ids[self.allowed[ids]]
+
+
+# Placements for a size and constraints (`together` as a tuple of tuples), all views of one
+# shared catalog
+@functools.lru_cache(maxsize=16)
+def get_catalog(size, together=(), no_boxes=False, directory=None):
+    return Placements(load_catalog(size, directory), together=together, no_boxes=no_boxes)
+
+
+# Random tiling search. `max_nodes` caps the placements tried in all (TimeoutError past it);
+# the search restarts with a fresh random order after `restart_nodes`, doubling each time,
+# because a random search is heavy-tailed
+class JigsawTiling(FlatLabels):
+
+    def __init__(self, size=9, together=(), no_boxes=False, auto_generate=True, rng=None, stats=None,
+            max_nodes=None, restart_nodes=200, directory=None):
+        self.size = size
+        self.rng = as_random(rng)
+        self.stats = GenerationStats() if stats is None else stats
+        self.max_nodes = max_nodes
+        self.restart_nodes = restart_nodes
+        with self.stats.phase('catalog'):
+            together = tuple(tuple(sorted((int(x), int(y)) for x, y in group)) for group in together)
+            self.placements = get_catalog(size, together=together, no_boxes=bool(no_boxes), directory=directory)
+            self.catalog = self.placements.catalog
+        self.full = (1 << size*size) - 1
+        # random priority of each cell for breaking ties between equally constrained cells (drawn
+        # again for each search)
+        self.priority = None
+        self.nodes = 0
+        self.lab = None
+        if auto_generate is True:
+            if self.generate() is None:
+                raise ValueError('no {0}x{0} tiling meets the constraints'.format(size))
+
+    # Search for a tiling; returns the label grid, or None once a full search finds none
+    def generate(self):
+        budget, spent = self.restart_nodes, 0
+        with self.stats.phase('search'):
+            while True:
+                if self.max_nodes is not None:
+                    budget = min(budget, self.max_nodes - spent)
+                self.priority = np.array(self.rng.sample(range(0, self.size*self.size), self.size*self.size))
+                self.nodes = 0
+                chosen = self.search(0, list(), budget)
+                spent += self.nodes
+                if chosen is not None or self.nodes < budget:
+                    break
+                if self.max_nodes is not None and spent >= self.max_nodes:
+                    raise TimeoutError
+                self.stats.restart(reason='budget', nodes=self.nodes)
+                budget *= 2
+        if chosen is None:
+            return None
+        lab = np.zeros(self.size*self.size, dtype=np.uint8)
+        for k, p in enumerate(chosen):
+            lab[self.catalog.cells[p]] = k + 1
+        self.lab = lab
+        return self.labels
+
+    # Free cell to fill next: fewest free neighbours, then lowest random priority
+    def pick_cell(self, free):
+        grid = free.reshape(self.size, self.size)
+        count = np.zeros(grid.shape, dtype=np.int64)
+        count[1:, :] += grid[:-1, :]
+        count[:-1, :] += grid[1:, :]
+        count[:, 1:] += grid[:, :-1]
+        count[:, :-1] += grid[:, 1:]
+        score = np.where(free, count.ravel()*len(free) + self.priority, np.iinfo(np.int64).max)
+        return int(score.argmin())
+
+    # Depth-first search from the bitboard `occupied`; returns the chosen placements, or None.
+    # Gives up (None) once `budget` placements have been tried
+    def search(self, occupied, chosen, budget):
+        if occupied == self.full:
+            return list(chosen)
+        size, catalog = self.size, self.catalog
+        free = np.unpackbits(np.frombuffer((self.full & ~occupied).to_bytes((size*size + 7) // 8, 'little'),
+            dtype=np.uint8), bitorder='little')[:size*size].astype(bool)
+        cell = self.pick_cell(free)
+        through = self.placements.through(cell)
+        occ = np.frombuffer(occupied.to_bytes(8*catalog.words.shape[1], 'little'), dtype='<u8')
+        fits = through[~(catalog.words[through] & occ).any(axis=1)]
+        self.stats.cells_tried += 1
+        for p in self.rng.sample(fits.tolist(), len(fits)):
+            if self.nodes >= budget:
+                return None
+            self.nodes += 1
+            taken = occupied | catalog.mask(p)
+            left = free.copy()
+            left[catalog.cells[p]] = False
+            if any(n % size != 0 for n in component_sizes(left.reshape(size, size))):
+                self.stats.exclusions += 1
+                continue
+            chosen.append(p)
+            out = self.search(taken, chosen, budget)
+            if out is not None:
+                return out
+            chosen.pop()
+            self.stats.backtracks += 1
+        return None
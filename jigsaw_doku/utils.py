@@ -1,23 +1,84 @@
-import logging
-from rich.logging import RichHandler
-from shapely.geometry import Polygon, box, Point
-from shapely.ops import unary_union
-       
-logger_blocklist=[
-        "matplotlib",
-        "fontTools",
-        "shapely",
-        "PIL",
-        "itertools"]
-
-# Set logging format
-FORMAT = "%(message)s"
-logging.basicConfig(
-    level=20, format=FORMAT, datefmt="[%X]", handlers=[RichHandler()]
-)  # set level=20 or logging.INFO to turn off debug. to not set, level = "NOTSET"
-for module in logger_blocklist:
-    logging.getLogger(module).setLevel(logging.WARNING)
-logger = logging.getLogger("rich")
+import logging, functools, random
+
+# Logging is configured by the caller; importing the package adds no handlers
+logger = logging.getLogger(__name__)
+
+
+# shapely is only imported once a geometry is actually built, so importing the package (and the
+# grid / values engines, which never touch geometry) stays cheap
+def box(minx, miny, maxx, maxy):
+    from shapely.geometry import box
+    return box(minx, miny, maxx, maxy)
+
+
+def Point(x, y):
+    from shapely.geometry import Point
+    return Point(x, y)
+
+
+def unary_union(geoms):
+    from shapely.ops import unary_union
+    return unary_union(geoms)
+
+
+def is_polygon(geom):
+    from shapely.geometry import Polygon
+    return isinstance(geom, Polygon)
+
+
+# Random source for one generation: the `random.Random`-like object passed in, a new one seeded
+# with an int, or for None a new one seeded from the `random` module (so `random.seed` still makes
+# runs repeatable). Generators keep it on the instance and never touch the shared module state
+def as_random(rng=None):
+    if rng is None:
+        return random.Random(random.getrandbits(64))
+    if isinstance(rng, int):
+        return random.Random(rng)
+    return rng
+
+
+# 4-neighbours of every (x, y) cell on a size x size board, computed once per size
+@functools.lru_cache(maxsize=None)
+def grid_neighbours(size):
+    return {(x, y): tuple((i, j) for i, j in ((x-1, y), (x+1, y), (x, y-1), (x, y+1)) \
+        if 0 <= i < size and 0 <= j < size) for x in range(0, size) for y in range(0, size)}
+
+
+# The same neighbours by flat index (cell = x*size + y): entry i lists the neighbours of cell i
+@functools.lru_cache(maxsize=None)
+def flat_neighbours(size):
+    return tuple(tuple(i*size + j for i, j in ((x-1, y), (x+1, y), (x, y-1), (x, y+1)) \
+        if 0 <= i < size and 0 <= j < size) for x in range(0, size) for y in range(0, size))
+
+
+# True if `cells` (a set of flat indices) is 4-connected, with `adjacent` from `flat_neighbours`
+def flat_connected(cells, adjacent):
+    start = next(iter(cells))
+    seen = {start}
+    stack = [start]
+    while stack:
+        for j in adjacent[stack.pop()]:
+            if j in cells and j not in seen:
+                seen.add(j)
+                stack.append(j)
+    return len(seen) == len(cells)
+
+
+# Move cell i from region set `cells_a` to `cells_b` and cell j the other way, keeping the trade
+# only if both regions stay connected. Returns True if it was kept (the sets are left as before
+# otherwise); callers update their own labels
+def trade_cells(cells_a, cells_b, i, j, adjacent):
+    cells_a.discard(i)
+    cells_a.add(j)
+    cells_b.discard(j)
+    cells_b.add(i)
+    if flat_connected(cells_a, adjacent) and flat_connected(cells_b, adjacent):
+        return True
+    cells_a.discard(j)
+    cells_a.add(i)
+    cells_b.discard(i)
+    cells_b.add(j)
+    return False
 
 
 def row_to_cell(row, r, cells, x_dir, y_dir):
@@ -54,7 +115,7 @@ def region_exterior_cells(r):
 def divide_region(r):
     ext_cells = region_exterior_cells(r)
     int_cells = r.difference(unary_union(ext_cells))
-    if type(int_cells) == Polygon:
+    if is_polygon(int_cells):
         crds = list(int_cells.exterior.coords)
         if len(crds) != 0:
             ext_cells += region_exterior_cells(int_cells)
@@ -85,4 +146,160 @@ def check_point(point, available_region, ext=True):
                 return box(point[0]-1, point[1], point[0], point[1]+1)
             elif Point(point[0]-.5, point[1]-.5).within(available_region):
                 return box(point[0]-1, point[1]-1, point[0], point[1])
-    raise ValueError
\ No newline at end of file
+    raise ValueError
+
+# Connected pieces of free space on a size x size board, kept up to date as cells are taken or
+# released. `piece` maps each free (x, y) to its piece id, `members` maps piece id -> set of cells.
+class FreeSpace:
+
+    def __init__(self, size, free=None):
+        self.size = size
+        self.adjacent = grid_neighbours(size)
+        self.piece = dict()
+        self.members = dict()
+        self.next_id = 0
+        free = set(self.adjacent) if free is None else set(free)
+        while free:
+            start = free.pop()
+            stack, cells = [start], [start]
+            while stack:
+                for n in self.adjacent[stack.pop()]:
+                    if n in free:
+                        free.discard(n)
+                        stack.append(n)
+                        cells.append(n)
+            self.new_piece(cells)
+
+    def __contains__(self, cell):
+        return cell in self.piece
+
+    def __len__(self):
+        return len(self.piece)
+
+    def copy(self):
+        out = FreeSpace.__new__(FreeSpace)
+        out.size = self.size
+        out.adjacent = self.adjacent
+        out.piece = dict(self.piece)
+        out.members = {k: set(v) for k, v in self.members.items()}
+        out.next_id = self.next_id
+        return out
+
+    # Sizes of every piece of free space
+    def piece_sizes(self):
+        return [len(m) for m in self.members.values()]
+
+    # Give `cells` a piece id of their own
+    def new_piece(self, cells):
+        k = self.next_id
+        self.next_id += 1
+        self.members[k] = set()
+        for c in cells:
+            old = self.piece.get(c)
+            if old is not None:
+                self.members[old].discard(c)
+            self.piece[c] = k
+            self.members[k].add(c)
+        return k
+
+    # What taking `cell` would do to its piece, without changing anything. Searches run in
+    # lock-step from each free neighbour and merge when they meet; they stop as soon as at most
+    # one is still going, so the cost is bounded by the smaller pieces that get cut off.
+    # Returns (pieces, rest): the cut-off pieces as cell lists, and the size of the piece still
+    # being searched (None if every piece was fully searched)
+    def split(self, cell):
+        pid = self.piece[cell]
+        starts = [n for n in self.adjacent[cell] if self.piece.get(n) == pid]
+        if len(starts) <= 1:
+            return list(), len(self.members[pid]) - 1
+        owner = {cell: -1}
+        owner.update((s, i) for i, s in enumerate(starts))
+        parent = list(range(len(starts)))
+        stacks = [[s] for s in starts]
+        found = [[s] for s in starts]
+        live = list(range(len(starts)))
+        pieces = list()
+
+        def find(i):
+            while parent[i] != i:
+                parent[i] = parent[parent[i]]
+                i = parent[i]
+            return i
+
+        while len(live) > 1:
+            for i in list(live):
+                if i not in live:
+                    continue
+                if not stacks[i]:
+                    live.remove(i)
+                    pieces.append(found[i])
+                    continue
+                for n in self.adjacent[stacks[i].pop()]:
+                    if self.piece.get(n) != pid:
+                        continue
+                    j = owner.get(n)
+                    if j is None:
+                        owner[n] = i
+                        stacks[i].append(n)
+                        found[i].append(n)
+                    elif j != -1:
+                        j = find(j)
+                        if j != i:
+                            parent[j] = i
+                            stacks[i] += stacks[j]
+                            found[i] += found[j]
+                            live.remove(j)
+        if len(live) == 0:
+            return pieces, None
+        return pieces, len(self.members[pid]) - 1 - sum(len(p) for p in pieces)
+
+    # Sizes of the pieces that `cell`'s piece would break into if it were taken
+    def split_sizes(self, cell):
+        pieces, rest = self.split(cell)
+        return [len(p) for p in pieces] + ([rest] if rest else [])
+
+    # Cells that must be taken along with `cell` by a region that still needs `need` more cells
+    # (pieces it would cut off that can't become regions of their own), or None if taking it
+    # would leave free space that can't be divided into regions of `size`
+    def check_take(self, cell, need):
+        pieces, rest = self.split(cell)
+        partial = sorted([p for p in pieces if len(p) % self.size != 0], key=len)
+        if rest is not None and rest % self.size != 0:
+            # the region grows on into the piece that wasn't fully searched
+            keep = rest
+        elif partial:
+            keep = len(partial.pop())
+        else:
+            return list() if need == 0 else None
+        absorb = [c for p in partial for c in p]
+        if len(absorb) >= need or keep % self.size != (need - len(absorb)) % self.size:
+            return None
+        return absorb
+
+    # Remove `cell` from free space, splitting its piece if needed
+    def take(self, cell):
+        pieces, rest = self.split(cell)
+        pid = self.piece.pop(cell)
+        self.members[pid].discard(cell)
+        if rest is None:
+            # every piece was searched: the largest keeps the old id
+            pieces.sort(key=len)
+            pieces.pop()
+        for p in pieces:
+            self.new_piece(p)
+        if not self.members[pid]:
+            del self.members[pid]
+
+    # Return `cell` to free space, merging the pieces it touches
+    def release(self, cell):
+        ids = {self.piece[n] for n in self.adjacent[cell] if n in self.piece}
+        if not ids:
+            self.new_piece([cell])
+            return
+        keep = max(ids, key=lambda k: len(self.members[k]))
+        for k in ids - {keep}:
+            for c in self.members.pop(k):
+                self.piece[c] = keep
+                self.members[keep].add(c)
+        self.piece[cell] = keep
+        self.members[keep].add(cell)
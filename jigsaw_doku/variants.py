@@ -0,0 +1,104 @@
+# Derive many puzzles from one solved (layout, digits) pair. Rotating or reflecting the layout
+# and digits together, and renaming the digits, keeps every row, column and region valid, so
+# each of the 8 * size! transforms is another solved board (and another puzzle, if givens are
+# carried along). Transforms are applied to whole batches with numpy fancy indexing
+import itertools
+import numpy as np
+from .store import dihedral, relabel
+
+# Sizes whose 8 * size! transforms (40,320 at 7x7) are all enumerated rather than sampled
+EXHAUSTIVE_SIZE = 7
+
+
+# numpy Generator from None, a seed, a Generator, or a `random.Random`-like object
+def as_generator(rng=None):
+    if isinstance(rng, np.random.Generator):
+        return rng
+    if hasattr(rng, 'getrandbits'):
+        return np.random.default_rng(rng.getrandbits(64))
+    return np.random.default_rng(rng)
+
+
+# Apply transforms to one board: `t` is a (K,) array of dihedral indices (see `store.dihedral`)
+# and `perms` a (K, size) array mapping digit d to perms[:, d - 1]. Returns (K, size, size) stacks
+# of labels and digits, plus givens (0 stays blank) if given
+def apply_transforms(labels, grid, t, perms, givens=None):
+    k = np.arange(len(t))[:, None, None]
+    out_labels = dihedral(labels)[t]
+    out_grid = perms[k, dihedral(grid)[t].astype(np.int64) - 1].astype(np.uint8)
+    if givens is None:
+        return out_labels, out_grid, None
+    g = dihedral(givens)[t].astype(np.int64)
+    out_givens = np.where(g > 0, perms[k, (g - 1).clip(0)], 0).astype(np.uint8)
+    return out_labels, out_grid, out_givens
+
+
+# Distinct variants of a solved board in batches of at most `chunk`, `k` in all. None equals the
+# board itself or an earlier variant; boards are the same when they have the same digits and the
+# same regions (whatever their numbering). Yields (labels, grids, givens) stacks of shape
+# (n, size, size); givens is None if not passed. Up to EXHAUSTIVE_SIZE every transform is tried
+# once in random order, so fewer than `k` come out only when the board has fewer than `k`
+# distinct variants. Larger boards have at least size! distinct variants (a transform is only
+# repeated by one of the 8 dihedral ones), so transforms are sampled and the draws stop after
+# three batches in a row that bring nothing new
+def iter_variant_batches(labels, grid, k, rng=None, givens=None, chunk=1024):
+    labels = np.asarray(labels, dtype=np.uint8)
+    grid = np.asarray(grid, dtype=np.uint8)
+    size = labels.shape[0]
+    gen = as_generator(rng)
+    seen = {(relabel(labels).tobytes(), grid.tobytes())}
+    order = None
+    if size <= EXHAUSTIVE_SIZE:
+        all_perms = np.array(list(itertools.permutations(range(1, size + 1))), dtype=np.uint8)
+        order = gen.permutation(8*len(all_perms))
+    produced, dry, drawn = 0, 0, 0
+    while produced < k and dry < 3:
+        want = min(chunk, k - produced)
+        # draw a little extra so a batch usually covers any duplicates
+        n = want + want//8 + 8
+        if order is None:
+            t = gen.integers(0, 8, n)
+            perms = np.argsort(gen.random((n, size)), axis=1).astype(np.uint8) + 1
+        elif drawn < len(order):
+            pick = order[drawn:drawn + n]
+            t, perms = pick % 8, all_perms[pick // 8]
+        else:
+            break
+        out_labels, out_grid, out_givens = apply_transforms(labels, grid, t, perms, givens)
+        forms = relabel(out_labels)
+        keep, examined = list(), 0
+        for i in range(0, len(t)):
+            examined += 1
+            key = (forms[i].tobytes(), out_grid[i].tobytes())
+            if key not in seen:
+                seen.add(key)
+                keep.append(i)
+                if len(keep) == want:
+                    break
+        # transforms past the last one examined are left for the next batch
+        drawn += examined
+        if len(keep) == 0:
+            if order is None:
+                dry += 1
+            continue
+        dry = 0
+        produced += len(keep)
+        yield out_labels[keep], out_grid[keep], None if out_givens is None else out_givens[keep]
+
+
+# Up to `k` distinct variants of a solved board as (labels, grids, givens) stacks (see
+# `iter_variant_batches`)
+def make_variants(labels, grid, k, rng=None, givens=None):
+    size = len(labels)
+    batches = list(iter_variant_batches(labels, grid, k, rng=rng, givens=givens, chunk=max(k, 1)))
+    if len(batches) == 0:
+        empty = np.empty((0, size, size), dtype=np.uint8)
+        return empty, empty.copy(), None if givens is None else empty.copy()
+    return tuple(None if b[0] is None else np.concatenate(b) for b in zip(*batches))
+
+
+# Variants one board at a time, as (labels, grid, givens) tuples
+def iter_variants(labels, grid, k, rng=None, givens=None, chunk=1024):
+    for out_labels, out_grid, out_givens in iter_variant_batches(labels, grid, k, rng=rng, givens=givens, chunk=chunk):
+        for i in range(0, len(out_labels)):
+            yield out_labels[i], out_grid[i], None if out_givens is None else out_givens[i]
@@ -0,0 +1,32 @@
+import asyncio
+import random
+import pytest
+from jigsaw_doku.aio import generate_layout, generate_layouts, layout_labels
+from test_board import check_layout
+
+
+def test_generate_layouts():
+    layouts = asyncio.run(generate_layouts(12, size=9, seed=4, concurrency=3))
+    assert layouts.shape == (12, 9, 9)
+    for labels in layouts:
+        check_layout(labels, 9)
+    # same seed, same layouts, however many run at once
+    assert (asyncio.run(generate_layouts(12, size=9, seed=4, concurrency=1)) == layouts).all()
+    board = asyncio.run(generate_layout(6, engine='shapely', rng=random.Random(1)))
+    check_layout(layout_labels(board), 6)
+
+
+def test_generate_layout_bounded():
+    with pytest.raises(TimeoutError):
+        asyncio.run(generate_layout(9, timeout=0))
+    # the budget counts the steps actually run, not whole chunks
+    with pytest.raises(RuntimeError, match='after 2 region steps'):
+        asyncio.run(generate_layout(9, max_steps=2))
+
+    async def cancel():
+        task = asyncio.ensure_future(generate_layouts(1000, size=12, seed=0))
+        await asyncio.sleep(0.05)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+    asyncio.run(cancel())
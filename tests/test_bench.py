@@ -0,0 +1,38 @@
+import json
+import time
+from jigsaw_doku import bench
+
+
+def test_run_case():
+    result = bench.run_case('layout_grid', 6, runs=3, timeout=10)
+    assert result['failures'] == 0 and result['attempts_per_success'] >= 1
+    assert 0 < result['median_ms'] <= result['p95_ms'] <= result['p99_ms']
+    assert result['peak_kib'] > 0
+
+
+def test_deadline_counts_failures(monkeypatch):
+    monkeypatch.setitem(bench.CASES, 'slow', lambda size, seed: time.sleep(1))
+    result = bench.run_case('slow', 4, runs=2, timeout=0.05)
+    assert result['failures'] == 2 and result['median_ms'] is None
+
+
+def test_setup_is_untimed(monkeypatch):
+    calls = list()
+    monkeypatch.setitem(bench.CASES, 'quick', lambda size, seed: calls.append(seed) or 1)
+    monkeypatch.setitem(bench.SETUP, 'quick', lambda size: time.sleep(0.2) or calls.append('setup'))
+    result = bench.run_case('quick', 4, runs=2, timeout=1)
+    assert calls[0] == 'setup' and result['p99_ms'] < 100
+
+
+def test_report_is_json(tmp_path):
+    out = tmp_path / 'bench.json'
+    report = bench.main(['--cases', 'layout_sudoku', '--sizes', '4', '--runs', '2', '--out', str(out)])
+    assert json.loads(out.read_text())['results'] == report['results']
+
+
+def test_unsupported_sizes_skipped():
+    assert not bench.supported('large', 7) and not bench.supported('values', 12)
+    assert bench.supported('values', 7) and bench.supported('layout_grid', 16)
+    report = bench.run(cases=['large'], sizes=(7, 12), runs=1, timeout=5)
+    assert [(r['case'], r['size']) for r in report['results']] == [('large', 12)]
+
@@ -0,0 +1,122 @@
+import random
+import numpy as np
+import pytest
+from jigsaw_doku.jigsaw_board import JigsawChain, JigsawGrid, JigsawSudoku, regions_to_labels, start_labels
+from jigsaw_doku.utils import FreeSpace, flat_neighbours, grid_neighbours, trade_cells
+from jigsaw_doku.batch import generate_many
+
+
+# every region has `size` cells and is 4-connected
+def check_layout(labels, size):
+    assert sorted(np.bincount(labels.ravel(), minlength=size + 1)[1:]) == [size]*size
+    for k in range(1, size + 1):
+        cells = set(zip(*[a.tolist() for a in np.nonzero(labels == k)]))
+        stack, seen = [next(iter(cells))], set()
+        while stack:
+            x, y = stack.pop()
+            if (x, y) in seen:
+                continue
+            seen.add((x, y))
+            stack += [n for n in ((x-1, y), (x+1, y), (x, y-1), (x, y+1)) if n in cells]
+        assert seen == cells
+
+
+@pytest.mark.parametrize('size', [4, 6, 9])
+def test_grid_layout(size):
+    random.seed(size)
+    g = JigsawGrid(size=size)
+    check_layout(g.labels, size)
+    assert len(g.free_components()) == 0
+
+
+def test_grid_regions():
+    random.seed(0)
+    g = JigsawGrid(size=9)
+    regions = g.regions
+    assert list(regions.keys()) == list(range(1, 10))
+    assert all(len(r.cells) == 9 for r in regions.values())
+    assert (regions_to_labels(regions, 9) == g.labels).all()
+
+
+def test_sudoku_layout():
+    random.seed(1)
+    j = JigsawSudoku(size=9)
+    check_layout(regions_to_labels(j.regions, 9), 9)
+    assert j.free == set() and len(j.used) == 81
+
+
+def test_sudoku_snapshot_restore():
+    j = JigsawSudoku(size=6, auto_generate=False, rng=random.Random(3))
+    empty = j.snapshot()
+    j.timeout = 10
+    j.generate_all_regions()
+    assert len(j.regions) == 6 and len(j.space) == 0
+    j.restore(empty)
+    assert j.regions == dict() and len(j.space) == 36 and j.used == set()
+    # the snapshot is reusable: generating again from it gives a full layout
+    j.generate_all_regions()
+    check_layout(regions_to_labels(j.regions, 6), 6)
+    for seed in range(0, 20):
+        check_layout(regions_to_labels(JigsawSudoku(size=9, rng=random.Random(seed)).regions, 9), 9)
+
+
+@pytest.mark.parametrize('size', [5, 9, 12])
+def test_chain_layout(size):
+    c = JigsawChain(size=size, rng=random.Random(size))
+    check_layout(c.labels, size)
+    assert (c.labels != start_labels(size)).any()
+    assert c.stats.restarts == 0 and c.stats.calls['swaps'] == 1
+    # consecutive layouts from one chain are all valid and keep moving
+    layouts = list(c.iter_layouts(3, steps=200))
+    for labels in layouts:
+        check_layout(labels, size)
+    assert (layouts[0] != layouts[2]).any()
+
+
+def test_chain_start():
+    # any valid partition can seed the chain; zero steps leaves it as it was
+    start = JigsawGrid(size=6, rng=random.Random(0)).labels
+    assert (JigsawChain(size=6, steps=0, start=start).labels == start).all()
+    with pytest.raises(ValueError):
+        JigsawChain(size=6, start=np.ones((6, 6)))
+    split = start_labels(6)
+    split[[0, 0], [0, 5]] = split[[0, 0], [5, 0]]
+    with pytest.raises(ValueError):
+        JigsawChain(size=6, start=split)
+
+
+def test_free_space_split():
+    f = FreeSpace(9)
+    # wall off the first two columns except for (2, 4)
+    for y in range(9):
+        if y != 4:
+            f.take((2, y))
+    assert sorted(f.split_sizes((2, 4))) == [18, 54]
+    assert f.check_take((2, 4), need=0) == []
+    f.take((2, 4))
+    assert sorted(f.piece_sizes()) == [18, 54]
+    f.release((2, 4))
+    assert f.piece_sizes() == [73]
+    # cutting off a single cell is only ok if the region can absorb it
+    g = FreeSpace(9)
+    g.take((1, 0))
+    assert g.check_take((0, 1), need=0) is None
+    assert g.check_take((0, 1), need=7) == [(0, 0)]
+
+
+def test_trade_cells():
+    adjacent = flat_neighbours(3)
+    assert all(sorted(adjacent[x*3 + y]) == sorted(i*3 + j for i, j in n) for (x, y), n in grid_neighbours(3).items())
+    # two lines of a 3x3 board: trading the middle cells would split both, trading opposite ends is fine
+    a, b = {0, 1, 2}, {3, 4, 5}
+    assert not trade_cells(a, b, 1, 4, adjacent) and a == {0, 1, 2} and b == {3, 4, 5}
+    assert trade_cells(a, b, 2, 3, adjacent) and a == {0, 1, 3} and b == {2, 4, 5}
+
+
+def test_generate_many():
+    layouts = generate_many(10, size=6, workers=2, seed=7, chunksize=4)
+    assert layouts.shape == (10, 6, 6) and layouts.dtype == np.uint8
+    for labels in layouts:
+        check_layout(labels, 6)
+    # same seed, same layouts, however many workers run it
+    assert (generate_many(10, size=6, workers=1, seed=7, chunksize=4) == layouts).all()
@@ -0,0 +1,53 @@
+import itertools
+import random
+import json
+import numpy as np
+import pytest
+from jigsaw_doku.__main__ import main
+from jigsaw_doku.batch import gen_solved, iter_puzzles
+from jigsaw_doku.packed import PackedReader
+from jigsaw_doku.puzzle import is_unique
+from test_solvers import check_solution
+
+
+def test_iter_puzzles():
+    puzzles = list(iter_puzzles(size=6, count=10, seed=1, chunksize=4))
+    assert len(puzzles) == 10 and len({p.seed for p in puzzles}) == 10
+    for p in puzzles:
+        check_solution(p.solution, p.labels)
+        assert (p.givens == p.solution).all()
+    # same stream on a process pool
+    pooled = list(iter_puzzles(size=6, count=10, seed=1, chunksize=4, workers=2))
+    assert all((a.labels == b.labels).all() and (a.solution == b.solution).all() for a, b in zip(puzzles, pooled))
+    # prime sizes grow a layout and fill it; endless streams stop when the caller does
+    p = next(itertools.islice(iter_puzzles(size=5, seed=2, givens=True), 3, None))
+    check_solution(p.solution, p.labels)
+    assert (p.givens == 0).any() and is_unique(p.givens, p.labels)
+
+
+def test_grid_fill_budget():
+    with pytest.raises(RuntimeError, match='after 2 layouts'):
+        gen_solved(9, random.Random(0), engine='grid', max_nodes=1, max_layouts=2)
+
+
+def test_cli_outputs(tmp_path, capsys):
+    out = tmp_path / 'p.ndjson'
+    assert main(['--count', '5', '--seed', '3', '--out', str(out)]) == 0
+    lines = [json.loads(l) for l in out.read_text().splitlines()]
+    assert len(lines) == 5 and lines[0]['size'] == 9
+    check_solution(np.array(lines[4]['solution']), np.array(lines[4]['labels']))
+    assert 'done: 5 puzzles' in capsys.readouterr().err
+    packed = tmp_path / 'p.jigp'
+    assert main(['--size', '12', '--count', '3', '--seed', '3', '--format', 'packed', '--out', str(packed)]) == 0
+    with PackedReader(str(packed)) as r:
+        assert len(r) == 3
+        check_solution(r.solutions[2], r.labels[2])
+
+
+@pytest.mark.parametrize('argv', [['--size', '7', '--engine', 'large'], ['--size', '1'], ['--size', '300'],
+    ['--size', '23'], ['--size', '25', '--engine', 'grid']])
+def test_cli_rejects_size(argv, capsys):
+    with pytest.raises(SystemExit) as e:
+        main(argv)
+    assert e.value.code == 2 and 'got {}'.format(argv[1]) in capsys.readouterr().err
+
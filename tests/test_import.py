@@ -0,0 +1,56 @@
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# heavy optional dependencies that must only load on the code paths that use them
+HEAVY = ('shapely', 'rich', 'sympy', 'rasterio', 'matplotlib')
+
+# generous for a cold start on a slow box; numpy alone is well under this
+IMPORT_BUDGET = 1.0
+
+MODULES = ('jigsaw_doku', 'jigsaw_doku.jigsaw_board', 'jigsaw_doku.jigsaw_values', 'jigsaw_doku.utils',
+    'jigsaw_doku.batch', 'jigsaw_doku.dlx', 'jigsaw_doku.puzzle', 'jigsaw_doku.batch_solver', 'jigsaw_doku.aio',
+    'jigsaw_doku.svg', 'jigsaw_doku.gen_svg', 'jigsaw_doku.tiling', 'jigsaw_doku.store', 'jigsaw_doku.variants',
+    'jigsaw_doku.packed', 'jigsaw_doku.large', 'jigsaw_doku.stats', 'jigsaw_doku.bench', 'jigsaw_doku.__main__')
+
+SCRIPT = '''
+import json, logging, sys, time
+start = time.perf_counter()
+for name in {modules!r}:
+    __import__(name)
+elapsed = time.perf_counter() - start
+print(json.dumps(dict(
+    elapsed=elapsed,
+    loaded=sorted(m for m in {heavy!r} if m in sys.modules),
+    root_handlers=len(logging.getLogger().handlers),
+    path=sys.path)))
+'''
+
+
+# import every module in a fresh interpreter and report what it did
+def cold_import():
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    out = subprocess.run([sys.executable, '-c', SCRIPT.format(modules=MODULES, heavy=HEAVY)],
+        cwd=ROOT, env=env, capture_output=True, text=True, check=True)
+    return json.loads(out.stdout)
+
+
+def test_import_is_side_effect_free():
+    report = cold_import()
+    assert report['loaded'] == []
+    assert report['root_handlers'] == 0
+    assert 'jigsaw_doku' not in report['path']
+
+
+def test_import_time_budget():
+    # best of three, so one slow start on a busy machine doesn't fail the run
+    elapsed = min(cold_import()['elapsed'] for _ in range(0, 3))
+    assert elapsed < IMPORT_BUDGET, 'cold import took {:.3f}s'.format(elapsed)
+
+
+def test_shapely_loads_on_demand():
+    from jigsaw_doku.utils import box, unary_union
+    assert unary_union([box(0, 0, 1, 1), box(1, 0, 2, 1)]).area == 2
@@ -0,0 +1,72 @@
+import random
+import time
+import numpy as np
+import pytest
+from jigsaw_doku.large import LargeBoard, box_shape, start_labels
+from test_board import check_layout
+
+
+def check_board(b):
+    size, labels, grid = b.size, b.labels, b.grid
+    check_layout(labels, size)
+    digits = list(range(1, size + 1))
+    for i in range(0, size):
+        assert sorted(grid[i]) == digits and sorted(grid[:, i]) == digits
+    for k in range(1, size + 1):
+        assert sorted(grid[labels == k]) == digits
+
+
+def test_start_board():
+    assert box_shape(12) == (3, 4) and box_shape(16) == (4, 4) and box_shape(13) is None
+    b = LargeBoard(size=12, auto_generate=False, rng=random.Random(0))
+    assert (b.labels == start_labels(12)).all()
+    check_board(b)
+    check_board(LargeBoard(size=6, steps=0, rng=random.Random(1)))
+
+
+@pytest.mark.parametrize('size', [4, 9, 12, 16])
+def test_large_board(size):
+    b = LargeBoard(size=size, rng=random.Random(size))
+    check_board(b)
+    assert b.stats.cells_tried > 0
+    if size >= 9:
+        assert (b.labels != start_labels(size)).any()
+
+
+def test_digit_swaps_keep_board_valid():
+    b = LargeBoard(size=9, steps=0, rng=random.Random(2))
+    assert any(b.swap_digits() for _ in range(0, 50))
+    check_board(b)
+    for k in range(1, 10):
+        for d in range(1, 10):
+            assert b.val[b.where[k][d]] == d and b.lab[b.where[k][d]] == k
+
+
+def test_boxes_mixed_away():
+    # starting boxes that are still whole regions, averaged over seeds
+    start = start_labels(9)
+    intact = list()
+    for seed in range(0, 10):
+        labels = LargeBoard(size=9, rng=random.Random(seed)).labels
+        intact.append(sum(len(np.unique(labels[start == k])) == 1 for k in range(1, 10)))
+    assert np.mean(intact) < 0.1
+    assert LargeBoard(size=9, rng=random.Random(0), no_boxes=False, steps=0).box_count() == 9
+    for seed in range(0, 3):
+        assert LargeBoard(size=25, rng=random.Random(seed)).box_count() == 0
+
+
+def test_boxes_left_are_reported(caplog):
+    b = LargeBoard(size=9, rng=random.Random(0), auto_generate=False)
+    assert b.break_boxes(0) == 9 and 'plain boxes left' in caplog.text
+
+
+def test_prime_size_rejected():
+    with pytest.raises(ValueError):
+        LargeBoard(size=7)
+
+
+def test_16x16_target():
+    # documented target: 16x16 layout plus values in under a second
+    start = time.perf_counter()
+    LargeBoard(size=16, rng=random.Random(0))
+    assert time.perf_counter() - start < 1.0
@@ -0,0 +1,70 @@
+import random
+from collections import Counter
+import numpy as np
+import pytest
+from jigsaw_doku.jigsaw_values import PathExclusions, SudokuValues, component_sizes, corner_tables, random_latin_square
+
+
+@pytest.mark.parametrize('size', [4, 9, 16])
+def test_latin_square(size):
+    grid = random_latin_square(size, rng=random.Random(size))
+    full = list(range(1, size + 1))
+    assert grid.shape == (size, size)
+    assert all(sorted(row) == full for row in grid.tolist())
+    assert all(sorted(col) == full for col in grid.T.tolist())
+
+
+def test_latin_square_covers_all():
+    # there are 12 Latin squares of order 3; the chain should reach every one of them
+    seen = Counter(random_latin_square(3, rng=random.Random(i)).tobytes() for i in range(600))
+    assert len(seen) == 12
+
+
+def test_component_sizes():
+    mask = np.ones((9, 9), dtype=bool)
+    mask[3, :] = False
+    assert sorted(component_sizes(mask)) == [27, 45]
+    mask[:, 0] = False
+    assert sorted(component_sizes(mask)) == [24, 40]
+    assert component_sizes(np.zeros((4, 4), dtype=bool)) == []
+
+
+def test_for_blocked_leaves_grid():
+    s = SudokuValues.__new__(SudokuValues)
+    s.size = 9
+    s.grid = random_latin_square(9, rng=random.Random(0))
+    before = s.grid.copy()
+    corner = [(0, i) for i in range(9)]
+    assert not s.test_for_blocked(corner)
+    # an L of 9 cells walling off (0, 0)
+    assert s.test_for_blocked([(0, 1), (1, 0), (1, 1)] + [(2, i) for i in range(6)])
+    assert (s.grid == before).all()
+
+
+def test_path_exclusions():
+    ex = PathExclusions(pinned=[((0, 0), (0, 1))], max_size=3)
+    ex.append([(1, 1), (1, 2)])
+    ex.append(((2, 2), (2, 3)))
+    assert ((1, 1), (1, 2)) in ex and len(ex) == 3
+    ex.append(((3, 3), (3, 4)))
+    # oldest unpinned path goes first; pinned paths stay
+    assert ((1, 1), (1, 2)) not in ex and ((0, 0), (0, 1)) in ex
+    assert len(ex) == 3 and ex.evicted == 1
+
+
+def test_corner_tables_cached():
+    tables = corner_tables(9)
+    assert corner_tables(9) is tables
+    starts, mask = tables[(0, 0)]
+    assert starts == ((1, 0), (0, 1)) and mask.sum() == 45 and not mask.flags.writeable
+
+
+def test_sudoku_values_corners():
+    random.seed(3)
+    for _ in range(2):
+        s = SudokuValues(size=9, set_to_default=True, attempts_per_grid=200)
+        assert len(s.corners) == 4 and all(len(c) == 9 for c in s.corners)
+        cells = [i for c in s.corners for i in c]
+        assert len(set(cells)) == 36
+        for c in s.corners:
+            assert sorted(s.grid[i] for i in c) == list(range(1, 10))
@@ -0,0 +1,35 @@
+import random
+import numpy as np
+import pytest
+from jigsaw_doku.large import LargeBoard
+from jigsaw_doku.packed import PackedReader, PackedWriter, pack_givens, record_dtype, unpack_givens
+from jigsaw_doku.puzzle import make_puzzle
+from jigsaw_doku.variants import make_variants
+
+
+def test_givens_bits_roundtrip():
+    givens = np.random.default_rng(0).integers(0, 10, (5, 9, 9))
+    assert (unpack_givens(pack_givens(givens), 9) == (givens > 0)).all()
+    assert record_dtype(9).itemsize == 1 + 81 + 81 + 11 + 2 + 2 + 8
+
+
+def test_write_and_mmap_read(tmp_path):
+    path = str(tmp_path / 'puzzles.jigp')
+    b = LargeBoard(size=9, rng=random.Random(0))
+    givens = make_puzzle(b.grid, b.labels, rng=random.Random(0))
+    labels, grids, puzzles = make_variants(b.labels, b.grid, 40, rng=0, givens=givens)
+    with PackedWriter(path, size=9) as w:
+        w.write_many(labels[:30], grids[:30], puzzles[:30], seeds=np.arange(30))
+    # reopening appends after the existing records
+    with PackedWriter(path, size=9) as w:
+        w.write_many(labels[30:], grids[30:], puzzles[30:], seeds=np.arange(30, 40))
+        w.write(b.labels, b.grid)
+    with PackedReader(path) as r:
+        assert len(r) == 41 and r.size == 9
+        lab, sol = r[17]
+        assert np.shares_memory(lab, r.records) and (lab == labels[17]).all() and (sol == grids[17]).all()
+        assert (r.puzzle(17) == puzzles[17]).all() and r.seeds[35] == 35
+        assert r.records['n_givens'][17] == (puzzles[17] > 0).sum()
+        assert r.givens_mask(40).all()
+    with pytest.raises(ValueError):
+        PackedWriter(path, size=6)
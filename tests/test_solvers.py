@@ -0,0 +1,98 @@
+import random
+import time
+import numpy as np
+import pytest
+from jigsaw_doku.jigsaw_board import JigsawGrid
+from jigsaw_doku import dlx, puzzle, batch_solver
+
+
+# standard 3x3 boxes as a label grid
+BOXES = np.array([[3*(x // 3) + y // 3 + 1 for y in range(9)] for x in range(9)], dtype=np.uint8)
+
+
+def check_solution(grid, labels):
+    size = labels.shape[0]
+    full = set(range(1, size + 1))
+    for i in range(size):
+        assert set(grid[i, :].tolist()) == full
+        assert set(grid[:, i].tolist()) == full
+        assert set(grid[labels == i + 1].tolist()) == full
+
+
+def test_dlx_fills_layout():
+    rng = random.Random(3)
+    labels = JigsawGrid(size=9, rng=rng).labels
+    grid = dlx.solve(labels, rng=rng)
+    check_solution(grid, labels)
+    check_solution(dlx.solve(BOXES, rng=rng), BOXES)
+
+
+def test_dlx_givens():
+    rng = random.Random(0)
+    full = dlx.solve(BOXES, rng=rng)
+    givens = full.copy()
+    givens[::2, ::3] = 0
+    assert (dlx.solve(BOXES, givens=givens, rng=rng) == full).all()
+    # two 1s in the same box
+    clash = np.zeros((9, 9), dtype=np.uint8)
+    clash[0, 0] = clash[1, 1] = 1
+    assert dlx.solve(BOXES, givens=clash) is None
+
+
+# 5x5 layout with no fill at all, and a 9x9 one whose search runs far past any sane budget
+NO_FILL = np.array([[4, 4, 2, 2, 2], [4, 4, 2, 1, 2], [4, 5, 5, 1, 1], [3, 3, 5, 5, 1], [3, 3, 3, 5, 1]])
+HARD = np.array([[3, 3, 3, 7, 7, 4, 4, 4, 4], [3, 3, 3, 7, 4, 4, 4, 4, 6], [3, 3, 5, 7, 7, 4, 6, 6, 6],
+    [3, 5, 5, 5, 7, 7, 6, 6, 6], [5, 5, 5, 5, 5, 7, 8, 6, 6], [9, 9, 9, 9, 9, 7, 8, 1, 1],
+    [2, 2, 2, 9, 9, 8, 8, 1, 1], [2, 2, 9, 9, 8, 8, 8, 1, 1], [2, 2, 2, 2, 8, 8, 1, 1, 1]])
+
+
+def test_dlx_no_fill():
+    assert dlx.solve(NO_FILL, rng=random.Random(0)) is None
+    # undecided searches end with TimeoutError, by default as well as with an explicit cap
+    with pytest.raises(TimeoutError):
+        dlx.solve(HARD, rng=random.Random(1), max_nodes=20000)
+    start = time.perf_counter()
+    with pytest.raises(TimeoutError):
+        dlx.solve(HARD, rng=random.Random(1))
+    assert time.perf_counter() - start < 30
+
+
+def test_count_solutions():
+    rng = random.Random(1)
+    full = dlx.solve(BOXES, rng=rng)
+    assert puzzle.count_solutions(full, BOXES) == 1
+    assert puzzle.count_solutions(np.zeros((9, 9), dtype=np.uint8), BOXES, limit=5) == 5
+    bad = full.copy()
+    bad[0, 0], bad[0, 1] = bad[0, 1], bad[0, 0]
+    assert puzzle.count_solutions(bad, BOXES) == 0
+
+
+def test_make_puzzle():
+    rng = random.Random(2)
+    labels = JigsawGrid(size=9, rng=rng).labels
+    full = dlx.solve(labels, rng=rng)
+    p = puzzle.make_puzzle(full, labels, rng=rng)
+    assert ((p == 0) | (p == full)).all() and (p == 0).sum() > 40
+    assert puzzle.is_unique(p, labels)
+    # budget: only 10 removals tried
+    assert (puzzle.make_puzzle(full, labels, attempts=10, rng=rng) == 0).sum() <= 10
+
+
+def test_solve_batch():
+    rng = random.Random(4)
+    labels, grids, fulls = list(), list(), list()
+    for _ in range(6):
+        lab = JigsawGrid(size=9, rng=rng).labels
+        full = dlx.solve(lab, rng=rng)
+        labels.append(lab)
+        fulls.append(full)
+        grids.append(puzzle.make_puzzle(full, lab, attempts=40, rng=rng))
+    # one board with a clash
+    bad = grids[0].copy()
+    bad[0, :2] = [1, 1]
+    grids.append(bad)
+    labels.append(labels[0])
+    out, status, rounds = batch_solver.solve_batch(np.array(grids), np.array(labels))
+    assert (out[:6] == np.array(fulls)).all()
+    assert (status[:6] > 0).all() and status[6] == batch_solver.UNSOLVABLE
+    assert (out[6] == 0).all()
@@ -0,0 +1,39 @@
+import json
+import random
+from jigsaw_doku.stats import GenerationStats
+from jigsaw_doku.jigsaw_board import JigsawGrid, JigsawSudoku
+from jigsaw_doku.jigsaw_values import SudokuValues
+
+
+def test_phases_and_callbacks():
+    events = list()
+    stats = GenerationStats()
+    stats.subscribe(lambda event, s, **info: events.append((event, info)))
+    for _ in range(0, 2):
+        with stats.phase('a'):
+            pass
+    stats.restart(reason='test')
+    stats.backtrack(regions=2)
+    assert stats.calls == {'a': 2} and stats.phases['a'] >= 0
+    assert [e for e, _ in events] == ['phase', 'phase', 'restart', 'backtrack']
+    assert events[-1][1] == {'n': 1, 'regions': 2}
+    assert stats.restarts == 1 and stats.backtracks == 1
+
+
+def test_layout_stats():
+    for cls in (JigsawGrid, JigsawSudoku):
+        phases = list()
+        stats = GenerationStats(callbacks=[lambda event, s, **info: phases.append(info.get('name'))])
+        g = cls(size=9, rng=random.Random(5), stats=stats)
+        assert g.stats is stats
+        assert set(stats.phases) == {'first_region', 'middle_regions', 'final_region'}
+        assert stats.calls['middle_regions'] >= 7 and phases[-1] == 'final_region'
+        assert stats.cells_tried >= 81 - 9
+        json.dumps(stats.as_dict())
+
+
+def test_values_stats():
+    s = SudokuValues(size=6, rng=2, attempts_per_grid=2000)
+    assert s.stats.attempts >= 1 and s.stats.cells_tried > 0
+    assert set(s.stats.phases) == {'grid', 'corners'}
+    assert s.stats.calls['grid'] == s.stats.restarts + 1
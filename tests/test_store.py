@@ -0,0 +1,47 @@
+import os
+import random
+import numpy as np
+import pytest
+from jigsaw_doku.batch import generate_many
+from jigsaw_doku.jigsaw_board import JigsawSudoku, regions_to_labels
+from jigsaw_doku.store import LayoutStore, canonical, dihedral
+
+
+def test_canonical_invariant():
+    labels = generate_many(1, 9, workers=1, seed=3)[0]
+    form = canonical(labels)
+    rng = np.random.default_rng(0)
+    for t in dihedral(labels):
+        perm = rng.permutation(9) + 1
+        assert (canonical(perm[t - 1]) == form).all()
+    assert len({canonical(l).tobytes() for l in generate_many(20, 9, workers=1, seed=4)}) == 20
+
+
+def test_store_dedup_and_reopen(tmp_path):
+    path = str(tmp_path / 'lib')
+    layouts = generate_many(50, 6, workers=1, seed=1)
+    with LayoutStore(path, size=6, merge_every=8) as store:
+        added = store.add_many(layouts)
+        assert added == len(store) == len({canonical(l).tobytes() for l in layouts})
+        i, new = store.add(np.fliplr(layouts[0]).copy())
+        assert not new and (store.get(i) == canonical(layouts[0])).all()
+    with LayoutStore(path, size=6) as store:
+        assert len(store) == added
+        assert layouts[10] in store
+        assert (store.sample(random.Random(0)) > 0).all()
+
+
+def test_store_regions_and_torn_write(tmp_path):
+    path = str(tmp_path / 'lib')
+    j = JigsawSudoku(size=6, rng=random.Random(2))
+    with LayoutStore(path, size=6) as store:
+        assert store.add(j.regions) == (0, True)
+        assert regions_to_labels(j.regions, 6) in store
+    # half a record left behind by an interrupted append
+    with open(os.path.join(path, 'layouts.bin'), 'ab') as f:
+        f.write(b'\x01'*10)
+    with LayoutStore(path, size=6) as store:
+        assert len(store) == 1
+        assert os.path.getsize(os.path.join(path, 'layouts.bin')) == 36
+    with pytest.raises(ValueError):
+        LayoutStore(path, size=9)
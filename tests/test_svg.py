@@ -0,0 +1,60 @@
+import random
+import re
+import xml.etree.ElementTree as ET
+import numpy as np
+from jigsaw_doku.batch import iter_puzzles
+from jigsaw_doku.jigsaw_board import JigsawSudoku, regions_to_labels
+from jigsaw_doku.svg import border_path, exterior_path, render_board, render_sheet, iter_sheets
+
+SVG = '{http://www.w3.org/2000/svg}'
+
+
+# unit edges ((x0, y0), (x1, y1)) drawn by a path of M/L/h/v commands
+def unit_edges(d):
+    edges, x, y = set(), 0, 0
+    for cmd, a, b in re.findall(r'([MLhv])([\d.]+)(?: ([\d.]+))?', d):
+        if cmd == 'M':
+            x, y = float(a), float(b)
+            continue
+        nx, ny = {'L': (float(a), float(b or 0)), 'h': (x + float(a), y), 'v': (x, y + float(a))}[cmd]
+        steps = int(abs(nx - x) + abs(ny - y))
+        for i in range(0, steps):
+            p = (x + (nx - x)*i/steps, y + (ny - y)*i/steps)
+            q = (x + (nx - x)*(i + 1)/steps, y + (ny - y)*(i + 1)/steps)
+            edges.add(tuple(sorted((p, q))))
+        x, y = nx, ny
+    return edges
+
+
+def test_borders_match_regions():
+    j = JigsawSudoku(size=9, rng=random.Random(2))
+    labels = regions_to_labels(j.regions, 9)
+    inner = unit_edges(border_path(labels))
+    # region outlines are the inner borders plus the frame
+    outlines = {e for e in unit_edges(exterior_path(j.regions, 9)) \
+        if not any(e[0][i] == e[1][i] in (0, 9) for i in (0, 1))}
+    assert outlines == inner
+    # every drawn edge separates two regions (cell (x, y) spans y from 8 - y to 9 - y)
+    for (x0, y0), (x1, y1) in inner:
+        if x0 == x1:
+            assert labels[int(x0) - 1, int(8 - y0)] != labels[int(x0), int(8 - y0)]
+        else:
+            assert labels[int(x0), int(9 - y0)] != labels[int(x0), int(8 - y0)]
+    ET.fromstring(render_board(j.regions))
+
+
+def test_board_and_sheets():
+    puzzles = list(iter_puzzles(size=9, count=30, seed=5))
+    labels = np.stack([p.labels for p in puzzles])
+    grids = np.stack([p.solution for p in puzzles])
+    grids[:, 0, 0] = 0
+    root = ET.fromstring(render_board(labels[0], grids[0]))
+    assert len(root.findall('.//' + SVG + 'text')) == 80
+    sheets = list(iter_sheets(labels, grids, cols=4, rows=3))
+    assert len(sheets) == 3
+    boards = [g for s in sheets for g in ET.fromstring(s).find(SVG + 'g')]
+    assert len(boards) == 30
+    # a sheet draws each board exactly as a single render does
+    single = ET.fromstring(render_board(labels[7], grids[7])).find(SVG + 'g')
+    assert [ET.tostring(e) for e in boards[7]] == [ET.tostring(e) for e in single]
+    assert render_sheet(labels[:5], cols=5).count('<text') == 0
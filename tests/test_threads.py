@@ -0,0 +1,26 @@
+import random
+from concurrent.futures import ThreadPoolExecutor
+from jigsaw_doku.jigsaw_board import JigsawGrid, JigsawSudoku, regions_to_labels
+from jigsaw_doku.jigsaw_values import SudokuValues
+from jigsaw_doku.large import LargeBoard
+
+
+# one board per seed from each engine, as arrays
+def build(seed):
+    grid = JigsawGrid(size=9, rng=random.Random(seed)).labels
+    sudoku = regions_to_labels(JigsawSudoku(size=6, rng=seed).regions, 6)
+    values = SudokuValues(size=6, rng=seed, attempts_per_grid=500).grid
+    large = LargeBoard(size=12, steps=2000, rng=seed).grid
+    return grid, sudoku, values, large
+
+
+def test_generators_are_thread_safe():
+    seeds = list(range(0, 6))
+    serial = [build(s) for s in seeds]
+    # the module-level stream is not consulted once a generator has its own rng
+    random.seed(0)
+    with ThreadPoolExecutor(max_workers=3) as pool:
+        threaded = list(pool.map(build, seeds))
+    for a, b in zip(serial, threaded):
+        assert all((x == y).all() for x, y in zip(a, b))
+    assert len({r[0].tobytes() for r in serial}) == len(seeds)
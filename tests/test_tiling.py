@@ -0,0 +1,56 @@
+import random
+import numpy as np
+import pytest
+from jigsaw_doku.tiling import JigsawTiling, count_free, fixed_polyominoes, get_catalog, load_catalog, placement_cells
+from test_board import check_layout
+
+
+@pytest.fixture(scope='module')
+def cache(tmp_path_factory):
+    return str(tmp_path_factory.mktemp('catalogs'))
+
+
+def test_polyomino_counts():
+    # fixed / free polyominoes of 1..9 cells
+    fixed = [1, 2, 6, 19, 63, 216, 760, 2725, 9910]
+    free = [1, 1, 2, 5, 12, 35, 108, 369, 1285]
+    assert [len(fixed_polyominoes(n)) for n in range(1, 10)] == fixed
+    assert [count_free(n) for n in range(1, 9)] == free[:8]
+
+
+def test_catalog_cache(cache):
+    catalog = load_catalog(5, cache)
+    assert catalog.words.shape == (len(placement_cells(5)), 1)
+    # every placement covers 5 cells, and the copy on disk loads back the same
+    assert all(bin(catalog.mask(p)).count('1') == 5 for p in range(0, len(catalog)))
+    for cell in range(0, 25):
+        assert (catalog.cells[catalog.through(cell)] == cell).any(axis=1).all()
+    assert catalog.starts[-1] == 5*len(catalog)
+    load_catalog.cache_clear()
+    again = load_catalog(5, cache)
+    assert (again.words == catalog.words).all() and (again.order == catalog.order).all()
+    # constrained views share the one catalog
+    assert get_catalog(5, no_boxes=True, directory=cache).catalog is get_catalog(5, directory=cache).catalog
+
+
+@pytest.mark.parametrize('size', [4, 5, 6, 9])
+def test_tiling_layout(size, cache):
+    t = JigsawTiling(size=size, rng=random.Random(size), directory=cache)
+    check_layout(t.labels, size)
+    assert t.stats.calls['search'] == 1
+
+
+def test_tiling_constraints(cache):
+    t = JigsawTiling(size=9, together=[[(0, 0), (4, 4)], [(8, 0), (8, 8)]], no_boxes=True,
+        rng=random.Random(1), directory=cache)
+    labels = t.labels
+    check_layout(labels, 9)
+    assert labels[0, 0] == labels[4, 4] and labels[8, 0] == labels[8, 8]
+    for k in range(1, 10):
+        xs, ys = np.nonzero(labels == k)
+        assert (np.ptp(xs), np.ptp(ys)) != (2, 2)
+    # cells too far apart for one region
+    with pytest.raises(ValueError):
+        JigsawTiling(size=9, together=[[(0, 0), (8, 8)]], directory=cache)
+    with pytest.raises(ValueError):
+        JigsawTiling(size=12)
@@ -0,0 +1,34 @@
+import random
+from jigsaw_doku.large import LargeBoard
+from jigsaw_doku.puzzle import make_puzzle, is_unique
+from jigsaw_doku.store import relabel
+from jigsaw_doku.variants import make_variants, iter_variant_batches
+from test_large import check_board
+
+
+def test_variants_are_valid_and_distinct():
+    b = LargeBoard(size=6, rng=random.Random(0))
+    givens = make_puzzle(b.grid, b.labels, rng=random.Random(0))
+    labels, grids, puzzles = make_variants(b.labels, b.grid, 500, rng=1, givens=givens)
+    assert labels.shape == grids.shape == puzzles.shape == (500, 6, 6)
+    keys = {(relabel(l).tobytes(), g.tobytes()) for l, g in zip(labels, grids)}
+    assert len(keys) == 500 and (relabel(b.labels).tobytes(), b.grid.tobytes()) not in keys
+    for i in range(0, 500, 50):
+        b.lab, b.val = labels[i].ravel().tolist(), grids[i].ravel().tolist()
+        check_board(b)
+        assert ((puzzles[i] == 0) | (puzzles[i] == grids[i])).all()
+        assert (puzzles[i] == 0).sum() == (givens == 0).sum()
+        assert is_unique(puzzles[i], labels[i])
+
+
+def test_variants_exhaust_small_boards():
+    b = LargeBoard(size=4, rng=random.Random(0))
+    # at most 8 * 4! transforms, less the board itself
+    labels, grids, givens = make_variants(b.labels, b.grid, 10000, rng=0)
+    assert len(labels) <= 8*24 - 1 and givens is None
+    # every transform is tried, so any reachable k comes out exactly
+    for seed in range(0, 5):
+        assert len(make_variants(b.labels, b.grid, len(labels), rng=seed)[0]) == len(labels)
+        assert len(make_variants(b.labels, b.grid, len(labels) - 11, rng=seed)[0]) == len(labels) - 11
+    batches = list(iter_variant_batches(b.labels, b.grid, 100, rng=0, chunk=30))
+    assert sum(len(l) for l, _, _ in batches) == 100 and max(len(l) for l, _, _ in batches) <= 30